@@ -0,0 +1,221 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic_data import SyntheticDataGenerator
+
+BENCH_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+ROWS_PER_CARD = 1000 # the Kaggle data has about 1800 rows per card
+
+# profiler record -> benchmark stage, the two scorer steps are one stage
+STAGE_OF = {
+    'DataManager.load_dataset': 'load',
+    'DataPreprocessor.clean_all': 'clean',
+    'FeatureEngineer.build_all_features': 'features',
+    'RiskScorer.calculate_risk_scores': 'score',
+    'RiskScorer.assign_risk_bands': 'score',
+    'TransactionFlagger.flag_suspicious_activity': 'flag',
+    'TransactionFlagger.calculate_performance': 'metrics',
+    'ReportGenerator.export_report_to_txt': 'report',
+}
+
+
+def measure_stages(path, rolling_window=7): # runs every stage once on one file, in this process
+    from data_manager import DataManager
+    from data_preprocessor import DataPreprocessor
+    from feature_engineer import FeatureEngineer
+    from report_generator import ReportGenerator
+    from risk_scorer_customer import RiskScorer
+    from stage_profiler import StageProfiler
+    from transaction_flagger import TransactionFlagger
+
+    profiler = StageProfiler(trace_path=None)
+    with tempfile.TemporaryDirectory() as tmp, profiler, contextlib.redirect_stdout(io.StringIO()):
+        dm = DataManager()
+        if not dm.load_dataset(path, use_cache=False): # always parse the CSV, the cache would hide the load cost
+            raise RuntimeError(f"Could not load {path}")
+        clean = DataPreprocessor(dm.get_dataframe(), copy=False).clean_all()
+        profiles = FeatureEngineer(clean, copy=False).build_all_features(rolling_window, show_sample=False)
+        scorer = RiskScorer(profiles)
+        scorer.calculate_risk_scores()
+        scored = scorer.assign_risk_bands(output_path=None, show_sample=False)
+        flagger = TransactionFlagger(clean, scored, copy=False)
+        flagged = flagger.flag_suspicious_activity(output_path=None)
+        metrics = flagger.calculate_performance()
+        ReportGenerator(flagged, scored, metrics).export_report_to_txt(os.path.join(tmp, "final_summary.txt"))
+
+    stages = {}
+    for rec in profiler.records:
+        if rec['depth'] != 0:
+            continue
+        stage = stages.setdefault(STAGE_OF[rec['stage']], {'wall_s': 0.0, 'cpu_s': 0.0, 'rows': rec['rows']})
+        stage['wall_s'] += rec['wall_s']
+        stage['cpu_s'] += rec['cpu_s']
+        stage['rss_delta_mb'] = stage.get('rss_delta_mb', 0.0) + rec['rss_delta_mb']
+        stage['peak_mb'] = max(stage.get('peak_mb', 0.0), rec['rss_peak_mb']) # resident peak while the stage ran
+    for stage in stages.values():
+        stage['rows_per_s'] = stage['rows'] / stage['wall_s'] if stage['rows'] and stage['wall_s'] > 0 else None
+    return stages
+
+
+class BenchmarkSuite:
+    # Runs the pipeline stages on seeded synthetic data of growing size and compares
+    # time and memory to a stored baseline. Every size runs in its own process,
+    # so the peak memory of one size does not carry over into the next.
+
+    def __init__(self, sizes=None, data_dir="cache/bench", baseline_path="benchmarks/baseline.json",
+                 time_tolerance=0.25, memory_tolerance=0.25, min_seconds=0.05, min_mb=50, seed=42, rolling_window=7):
+        self.sizes = sizes or BENCH_SIZES
+        self.data_dir = data_dir
+        self.baseline_path = baseline_path
+        self.time_tolerance = time_tolerance # allowed slowdown, 0.25 = 25%
+        self.memory_tolerance = memory_tolerance
+        self.min_seconds = min_seconds # smaller differences are timer noise
+        self.min_mb = min_mb
+        self.seed = seed
+        self.rolling_window = rolling_window
+        self.results = {}
+
+    def data_path(self, n_rows): # generated once per size and seed, then reused
+        path = os.path.join(self.data_dir, f"synthetic_{n_rows}_seed{self.seed}.csv")
+        if not os.path.exists(path):
+            n_cards = max(50, n_rows // ROWS_PER_CARD)
+            SyntheticDataGenerator(n_cards, seed=self.seed).write_csv(path, n_rows)
+        return path
+
+    def run_size(self, n_rows):
+        path = self.data_path(n_rows)
+        print(f"Benchmarking {n_rows} rows")
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            out_path = f.name
+        try:
+            cmd = [sys.executable, os.path.abspath(__file__), "--measure", path, "--out", out_path,
+                   "--rolling-window", str(self.rolling_window)]
+            subprocess.run(cmd, check=True)
+            with open(out_path) as f:
+                return json.load(f)
+        finally:
+            os.remove(out_path)
+
+    def run(self):
+        print("\n--- BENCHMARK STARTED ---\n")
+        start = time.perf_counter()
+        for n_rows in self.sizes:
+            self.results[str(n_rows)] = self.run_size(n_rows)
+        print(f"Benchmark finished in {time.perf_counter() - start:.1f}s")
+        print(self.table().to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+        print("\n--- BENCHMARK FINISHED ---\n")
+        return self.results
+
+    def table(self, results=None):
+        rows = []
+        for size, stages in (results or self.results).items():
+            for stage, m in stages.items():
+                rows.append({'rows': int(size), 'stage': stage, 'wall_s': m['wall_s'], 'cpu_s': m['cpu_s'],
+                             'rows_per_s': m['rows_per_s'], 'rss_delta_mb': m['rss_delta_mb'], 'peak_mb': m['peak_mb']})
+        return pd.DataFrame(rows)
+
+    def machine(self):
+        return {'python': platform.python_version(), 'pandas': pd.__version__, 'cpus': os.cpu_count(),
+                'platform': platform.platform(), 'seed': self.seed, 'rolling_window': self.rolling_window}
+
+    def save_baseline(self, path=None):
+        path = path or self.baseline_path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        baseline = self.load_baseline(path) or {'results': {}}
+        baseline['machine'] = self.machine()
+        baseline['results'].update(self.results) # sizes not run this time keep their old numbers
+        with open(path, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {path}")
+
+    def load_baseline(self, path=None):
+        path = path or self.baseline_path
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def compare(self): # rows that got slower or bigger than the baseline allows
+        baseline = self.load_baseline()
+        if baseline is None:
+            print(f"No baseline at {self.baseline_path}, save one with --save-baseline")
+            return None
+
+        if baseline.get('machine', {}).get('cpus') != os.cpu_count():
+            print("Warning: the baseline was recorded on a machine with a different CPU count")
+
+        rows = []
+        for size, stages in self.results.items():
+            for stage, m in stages.items():
+                base = baseline['results'].get(size, {}).get(stage)
+                if base is None:
+                    continue
+                slower = m['wall_s'] > base['wall_s'] * (1 + self.time_tolerance) and m['wall_s'] - base['wall_s'] > self.min_seconds
+                bigger = m['peak_mb'] > base['peak_mb'] * (1 + self.memory_tolerance) and m['peak_mb'] - base['peak_mb'] > self.min_mb
+                rows.append({'rows': int(size), 'stage': stage,
+                             'wall_s': m['wall_s'], 'base_wall_s': base['wall_s'], 'time_ratio': m['wall_s'] / base['wall_s'] if base['wall_s'] else float('nan'),
+                             'peak_mb': m['peak_mb'], 'base_peak_mb': base['peak_mb'],
+                             'regression': ", ".join([r for r, hit in [('time', slower), ('memory', bigger)] if hit])})
+
+        report = pd.DataFrame(rows)
+        print("\nComparison with baseline:")
+        if report.empty:
+            print("No sizes in common with the baseline")
+            return report
+        print(report.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+        regressions = report[report['regression'] != ""]
+        if len(regressions):
+            print(f"\n{len(regressions)} regression(s) beyond {self.time_tolerance:.0%} time / {self.memory_tolerance:.0%} memory")
+        else:
+            print("\nNo regressions")
+        return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic data of growing size")
+    parser.add_argument("--sizes", default=",".join(map(str, BENCH_SIZES)), help="comma separated row counts")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--data-dir", default="cache/bench")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    parser.add_argument("--rolling-window", type=int, default=7)
+    parser.add_argument("--results", default="outputs/benchmark_results.json", help="where this run's numbers are written")
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS) # internal: measure one file in this process
+    parser.add_argument("--out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        with open(args.out, "w") as f:
+            json.dump(measure_stages(args.measure, args.rolling_window), f)
+        sys.exit(0)
+
+    suite = BenchmarkSuite([int(s) for s in args.sizes.split(",")], args.data_dir, args.baseline,
+                           args.time_tolerance, args.memory_tolerance, rolling_window=args.rolling_window)
+    suite.run()
+
+    os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+    with open(args.results, "w") as f:
+        json.dump({'machine': suite.machine(), 'results': suite.results}, f, indent=2)
+
+    if args.save_baseline:
+        suite.save_baseline()
+        sys.exit(0)
+
+    report = suite.compare()
+    sys.exit(1 if report is not None and not report.empty and (report['regression'] != "").any() else 0) # non-zero for CI on a regression
@@ -0,0 +1,135 @@
+import os
+import time
+
+import numpy as np
+
+SHOW_COLUMNS = ['trans_date_trans_time', 'cc_num', 'amt', 'category', 'merchant', 'risk_level', 'is_flagged', 'is_fraud']
+
+
+def top_cards(profiles, band='Critical', n=20): # highest scored cards of a risk band
+    cards = profiles[profiles['risk_band'] == band]
+    return cards.sort_values('total_risk_score', ascending=False, kind='stable')['cc_num'].head(n).tolist()
+
+
+class CardIndex:
+    # Row positions of a frame (clean or flagged data) grouped by card: one stable sort by
+    # (cc_num, time) and the offset where each card's rows start. A card lookup is a binary search
+    # plus one slice, so a query reads only that card's rows instead of masking the whole frame.
+    # Only the positions are kept and saved, the rows stay in the frame the index was built on.
+
+    def __init__(self, df, order, cards, offsets, key=None):
+        self.df = df
+        self.order = order # row positions, sorted by card then time
+        self.cards = cards # distinct cc_num, sorted
+        self.offsets = offsets # rows of cards[i] are order[offsets[i]:offsets[i + 1]]
+        self.key = key # identifies the data the index was built on
+
+    @classmethod
+    def build(cls, df, key=None):
+        start = time.perf_counter()
+        cc = df['cc_num'].to_numpy()
+        if 'trans_date_trans_time' in df.columns:
+            order = np.lexsort((df['trans_date_trans_time'].to_numpy(), cc)) # stable, ties keep the row order
+        else:
+            order = np.argsort(cc, kind='stable')
+
+        cc_sorted = cc[order]
+        starts = np.flatnonzero(np.r_[True, cc_sorted[1:] != cc_sorted[:-1]]) if len(cc) else np.empty(0, dtype=np.int64)
+        index = cls(df, order, cc_sorted[starts], np.r_[starts, len(cc)], key)
+        print(f"Card index built: {len(index.cards)} cards, {len(df)} rows in {time.perf_counter() - start:.2f}s")
+        return index
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, order=self.order, cards=self.cards, offsets=self.offsets, key=np.array(self.key or ''))
+        os.replace(tmp_path, path)
+        print(f"Card index saved to {path}")
+
+    @classmethod
+    def load(cls, path, df, key=None): # None when missing or built on other data
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if (key is not None and str(data['key']) != key) or len(data['order']) != len(df):
+                return None
+            return cls(df, data['order'], data['cards'], data['offsets'], key)
+
+    def positions(self, cc_num): # row positions of one card, oldest first
+        i = np.searchsorted(self.cards, cc_num)
+        if i == len(self.cards) or self.cards[i] != cc_num:
+            return self.order[:0]
+        return self.order[self.offsets[i]:self.offsets[i + 1]]
+
+    def transactions(self, cc_num):
+        return self.df.iloc[self.positions(cc_num)]
+
+    def last(self, cc_num, n=50): # the card's latest n transactions, newest last
+        return self.df.iloc[self.positions(cc_num)[-n:]] if n > 0 else self.df.iloc[:0]
+
+    def flagged(self, cc_num):
+        rows = self.transactions(cc_num)
+        return rows[rows['is_flagged'].to_numpy() == 1]
+
+    def for_cards(self, cards, flagged_only=False): # rows of several cards, card by card
+        pos = [self.positions(c) for c in cards]
+        rows = self.df.iloc[np.concatenate(pos) if pos else self.order[:0]]
+        if flagged_only:
+            rows = rows[rows['is_flagged'].to_numpy() == 1]
+        return rows
+
+    def show(self, rows, label):
+        cols = [c for c in SHOW_COLUMNS if c in rows.columns]
+        print(f"\n{label}: {len(rows)} rows")
+        print(rows[cols].to_string(index=False, max_rows=60) if len(rows) else "No transactions")
+
+    def query_menu(self, profiles=None):
+        while True:
+            print("\n--- CARD INVESTIGATION MENU ---")
+            print("1. All transactions of a card")
+            print("2. Last N transactions of a card")
+            print("3. Flagged transactions of a card")
+            print("4. Flagged transactions of the top cards in a risk band")
+            print("0. Back to main menu")
+
+            choice = input("\nSelect query: ")
+            if choice == '0':
+                break
+            if choice not in ('1', '2', '3', '4'):
+                print("Invalid choice")
+                continue
+            if choice in ('3', '4') and 'is_flagged' not in self.df.columns:
+                print("Please run Transaction flagging (Option 7) first.")
+                continue
+            if choice == '4' and profiles is None:
+                print("Please run Risk Scoring (Option 6) first.")
+                continue
+
+            try:
+                if choice == '4':
+                    band = input("Risk band (default Critical): ").strip() or 'Critical'
+                    n = int(input("How many cards (default 20): ") or 20)
+                else:
+                    card = int(input("Card number (cc_num): "))
+                    n = int(input("How many (default 50): ") or 50) if choice == '2' else None
+            except ValueError:
+                print("Please enter a number")
+                continue
+
+            start = time.perf_counter()
+            if choice == '1':
+                rows, label = self.transactions(card), f"Transactions of {card}"
+            elif choice == '2':
+                rows, label = self.last(card, n), f"Last {n} transactions of {card}"
+            elif choice == '3':
+                rows, label = self.flagged(card), f"Flagged transactions of {card}"
+            else:
+                cards = top_cards(profiles, band, n)
+                rows, label = self.for_cards(cards, flagged_only=True), f"Flagged transactions of the top {len(cards)} {band} cards"
+            seconds = time.perf_counter() - start
+
+            self.show(rows, label)
+            print(f"Query time: {seconds * 1000:.1f} ms")
@@ -1,6 +1,8 @@
+from data_sketch import DataSketch
+
 class DataExplorator:
     
-    def __init__(self, df):
+    def __init__(self, df=None): # df=None for the approximate mode on files
         self.df = df
     
     def show_info(self):
@@ -25,7 +27,7 @@ class DataExplorator:
     def show_categories(self):
         print("\nCategorical Columns:")
         for col in self.df.columns:
-            if self.df[col].dtype == "object":
+            if self.df[col].dtype == "object" or self.df[col].dtype == "category":
                 print(col + ":", self.df[col].nunique(), "unique values")
         
     def explore_all(self):
@@ -37,3 +39,18 @@ class DataExplorator:
         self.show_stats()
         self.show_categories()
         print("\n--- EXPLORATION FINISHED ---")
+
+    def explore_approximate(self, paths=None, chunk_rows=500_000):
+        # sketches instead of exact describe / nunique: straight from the CSV or parquet files chunk by chunk,
+        # or from the loaded frame when no paths are given
+        print("\n--- APPROXIMATE EXPLORATION STARTED ---")
+        sketch = DataSketch()
+        if paths:
+            for path in paths:
+                sketch.add_file(path, chunk_rows)
+        else:
+            for start in range(0, len(self.df), chunk_rows):
+                sketch.update(self.df.iloc[start:start + chunk_rows])
+        sketch.print_summary()
+        print("\n--- APPROXIMATE EXPLORATION FINISHED ---")
+        return sketch
@@ -1,35 +1,169 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from memory_utils import get_frame_memory_mb, get_peak_memory_mb, get_process_memory_mb
+
+try:
+    import pyarrow.feather as feather # optional, needed for the columnar cache
+except ImportError:
+    feather = None
+
+# Compact dtypes for the fraudTrain / fraudTest columns
+COLUMN_TYPES = {
+    'Unnamed: 0': 'int32',
+    'cc_num': 'int64',
+    'merchant': 'category',
+    'category': 'category',
+    'amt': 'float64',
+    'first': 'category',
+    'last': 'category',
+    'gender': 'category',
+    'street': 'category',
+    'city': 'category',
+    'state': 'category',
+    'zip': 'int32',
+    'lat': 'float64',
+    'long': 'float64',
+    'city_pop': 'int32',
+    'job': 'category',
+    'trans_num': 'str',
+    'unix_time': 'int64',
+    'merch_lat': 'float64',
+    'merch_long': 'float64',
+    'is_fraud': 'int8',
+}
+
+# Fixed formats so pandas does not have to guess per row
+DATE_FORMATS = {
+    'trans_date_trans_time': '%Y-%m-%d %H:%M:%S',
+    'dob': '%Y-%m-%d',
+}
+
+SCHEMA_VERSION = 1 # bump when the schema above changes, so old caches are ignored
+
 
 class DataManager:
-    
-    def __init__(self):
+
+    def __init__(self, cache_dir="cache"):
         self.df = None #Attribute to hold the dataframe
-        
-    def load_dataset(self, file_path1, file_path2=None): #Load given CSV
+        self.cache_dir = cache_dir
+        self.load_stats = {} # timing and memory of the last load
+
+    def load_dataset(self, file_path1, file_path2=None, columns=None, use_cache=True): #Load given CSV
         print("\n--- LOADING STARTED ---\n")
+        start = time.perf_counter()
+        rss_before = get_process_memory_mb()
         try:
-            print(f"Loading {file_path1}")
-            df1 = pd.read_csv(file_path1)
-            print(f"Loaded {len(df1)} rows")
-            
-            if file_path2: # if two files, combine them
+            paths = [file_path1, file_path2] if file_path2 else [file_path1]
+            cache_path = self.get_cache_path(paths, columns) if use_cache else None
+            from_cache = False
+
+            if cache_path and os.path.exists(cache_path):
+                print(f"Loading cached data {cache_path}")
+                self.df = self.read_cache(cache_path)
+                from_cache = True
+                print(f"Loaded {len(self.df)} rows")
+
+            elif file_path2: # if two files, combine them, both read at the same time
+                print(f"Loading {file_path1}")
                 print(f"Loading {file_path2}")
-                df2 = pd.read_csv(file_path2)
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    f1 = pool.submit(self.read_csv_typed, file_path1, columns)
+                    f2 = pool.submit(self.read_csv_typed, file_path2, columns)
+                    df1, df2 = f1.result(), f2.result()
+                print(f"Loaded {len(df1)} rows")
                 print(f"Loaded {len(df2)} rows")
-                
-                self.df = pd.concat([df1, df2])
-                self.df = self.df.reset_index(drop=True) #to restart indexing and drop old index
+
+                self.df = self.concat_frames([df1, df2]) #restarts indexing too
+                self.df.attrs['source_files'] = [[file_path1, len(df1)], [file_path2, len(df2)]] # for the duplicate report
                 print(f"Concatenated total: {len(self.df)} rows")
-                print("\n--- LOADING FINISHED ---\n")
             else:
-                self.df = df1
-                
+                print(f"Loading {file_path1}")
+                self.df = self.read_csv_typed(file_path1, columns)
+                self.df.attrs['source_files'] = [[file_path1, len(self.df)]]
+                print(f"Loaded {len(self.df)} rows")
+
+            if cache_path and not from_cache:
+                self.write_cache(cache_path)
 
+            self.report_load(start, rss_before, from_cache)
+            print("\n--- LOADING FINISHED ---\n")
             return True
         except Exception as e:
             print(f"Loading file failed: {e}")
             return False
-    
+
+    def read_csv_typed(self, file_path, columns=None, chunksize=None): # with chunksize, returns an iterator of frames
+        header = pd.read_csv(file_path, nrows=0).columns
+        usecols = [c for c in header if columns is None or c in columns]
+
+        dtypes = {c: COLUMN_TYPES[c] for c in usecols if c in COLUMN_TYPES}
+        dates = [c for c in usecols if c in DATE_FORMATS]
+        formats = {c: DATE_FORMATS[c] for c in dates}
+
+        return pd.read_csv(file_path, usecols=usecols, dtype=dtypes, parse_dates=dates, date_format=formats, chunksize=chunksize)
+
+    def concat_frames(self, frames):
+        # give categorical columns the same categories, otherwise concat falls back to object
+        for col in frames[0].columns:
+            if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+                cats = union_categoricals([f[col] for f in frames], sort_categories=True).categories
+                for f in frames:
+                    f[col] = f[col].cat.set_categories(cats)
+
+        return pd.concat(frames, ignore_index=True)
+
+    def get_cache_path(self, paths, columns=None):
+        if feather is None:
+            print("pyarrow is not installed, loading without cache")
+            return None
+
+        # key on where the files are and on their size / modification time
+        sources = [os.path.abspath(p) for p in paths]
+        states = [(os.path.getsize(p), os.stat(p).st_mtime_ns) for p in paths]
+        source_key = hashlib.sha1(json.dumps([sources, sorted(columns) if columns else None]).encode()).hexdigest()[:12]
+        state_key = hashlib.sha1(json.dumps([states, SCHEMA_VERSION]).encode()).hexdigest()[:12]
+
+        return os.path.join(self.cache_dir, f"raw_{source_key}_{state_key}.arrow")
+
+    def read_cache(self, cache_path):
+        table = feather.read_table(cache_path, memory_map=True) # no CSV parsing, pages are mapped from disk
+        return table.to_pandas()
+
+    def write_cache(self, cache_path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        source_prefix = os.path.basename(cache_path).rsplit("_", 1)[0]
+
+        # older caches of the same files are stale now
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(source_prefix + "_") and name != os.path.basename(cache_path):
+                os.remove(os.path.join(self.cache_dir, name))
+
+        tmp_path = cache_path + ".tmp"
+        feather.write_feather(self.df, tmp_path, compression="uncompressed") # uncompressed so it can be memory mapped
+        os.replace(tmp_path, cache_path)
+        print(f"Saved cache {cache_path}")
+
+    def report_load(self, start, rss_before, from_cache):
+        self.load_stats = {
+            'source': 'cache' if from_cache else 'csv',
+            'seconds': time.perf_counter() - start,
+            'rows': len(self.df),
+            'frame_mb': get_frame_memory_mb(self.df),
+            'rss_before_mb': rss_before,
+            'rss_after_mb': get_process_memory_mb(),
+            'rss_peak_mb': get_peak_memory_mb(),
+        }
+        s = self.load_stats
+        print(f"\nLoad time ({s['source']}): {s['seconds']:.2f}s")
+        print(f"Dataframe size: {s['frame_mb']:.1f} MB")
+        print(f"Resident memory: {s['rss_before_mb']:.1f} MB -> {s['rss_after_mb']:.1f} MB (peak {s['rss_peak_mb']:.1f} MB)")
+
     def get_dataframe(self):
         return self.df
-
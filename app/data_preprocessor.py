@@ -1,57 +1,116 @@
+import numpy as np
 import pandas as pd
 
+from memory_utils import get_frame_memory_mb, get_process_memory_mb, print_memory_report
+from seen_keys import find_duplicates, hash_keys, hash_rows, source_file_ids
+
+CATEGORY_COLUMNS = ['merchant', 'category', 'city', 'state', 'job', 'gender'] # repeated text, stored once as categories
+
+
+def dedup_column(df, key): # the key duplicates are checked on, None (full rows) when the data lacks it
+    return key if key is not None and key in df.columns else None
+
+
+def dedup_hashes(df, key): # hashed key of every row, as remove_duplicates compares them with the seen keys
+    if key is None:
+        return hash_rows(df.drop(columns=['Unnamed: 0'], errors='ignore'))
+    return hash_keys(df[key])
+
 class DataPreprocessor:
-    def __init__(self, df):
-        self.df = df.copy()
-    
+    def __init__(self, df, copy=True, dedup_key='trans_num', seen_keys=None):
+        # copy=False shares the column data with the caller, new or dropped columns stay local to this stage
+        self.df = df.copy() if copy else df.copy(deep=False)
+        self.dedup_key = dedup_key # None compares full rows
+        self.seen_keys = seen_keys # SeenKeys of earlier loads, rows already seen there are dropped too (read only)
+        self.dedup_stats = {}
+
     def drop_unnamed_column(self):
-        self.df.drop(columns=['Unnamed: 0'], inplace=True) #modify directly
+        self.df.drop(columns=['Unnamed: 0'], inplace=True, errors='ignore') #modify directly, may be skipped at load
         return self.df
 
     def remove_duplicates(self):
-        before = len(self.df)
-        self.df.drop_duplicates(inplace=True)
-        after = len(self.df)
-        print("Removed duplicates:", (before - after)) #No. of duplicates removed
+        key = dedup_column(self.df, self.dedup_key)
+        if key != self.dedup_key:
+            print(f"No {self.dedup_key} column, comparing full rows")
+        if self.seen_keys is not None and self.seen_keys.key != key:
+            raise ValueError(f"Seen keys hold '{self.seen_keys.key or 'full rows'}', duplicates are checked on '{key or 'full rows'}'")
+
+        # the first occurrence of a key stays, key values are only hashed for the seen keys (or full rows)
+        hashes = dedup_hashes(self.df, key) if key is None else None
+        file_ids = source_file_ids(self.df)
+        within, across = find_duplicates(self.df[key] if key else hashes, file_ids)
+        drop = within | across
+
+        seen = np.zeros(len(drop), dtype=bool)
+        if self.seen_keys is not None:
+            hashes = hashes if hashes is not None else dedup_hashes(self.df, key)
+            seen = self.seen_keys.contains(hashes) & ~drop
+            drop |= seen
+
+        if drop.any():
+            self.df = self.df[~drop]
+        if 'source_files' in self.df.attrs: # rows per file after the drop
+            kept = np.bincount(file_ids[~drop], minlength=len(self.df.attrs['source_files']))
+            self.df.attrs['source_files'] = [[name, int(n)] for (name, _), n in zip(self.df.attrs['source_files'], kept)]
+
+        self.dedup_stats = {'key': key or 'full row', 'within_file': int(within.sum()),
+                            'across_files': int(across.sum()), 'seen_before': int(seen.sum())}
+        s = self.dedup_stats
+        print(f"Removed duplicates: {int(drop.sum())} (by {s['key']}: within a file {s['within_file']}, "
+              f"across files {s['across_files']}, seen in earlier loads {s['seen_before']})") #No. of duplicates removed
         return self.df
-    
+
     def convert_datetime(self):
         print("Fixing date formats")
         self.df['trans_date_trans_time'] = pd.to_datetime(self.df['trans_date_trans_time']) #convert trans time to datetime type
         self.df['dob'] = pd.to_datetime(self.df['dob'])  #convert dob to datetime type
         return self.df
-    
+
     def extract_time_features(self):
         print("Extracting hour and day") # extract hour, day, month from the date column
-        self.df['trans_hour'] = self.df['trans_date_trans_time'].dt.hour
-        self.df['trans_day'] = self.df['trans_date_trans_time'].dt.day
+        self.df['trans_hour'] = self.df['trans_date_trans_time'].dt.hour.astype('int8')
+        self.df['trans_day'] = self.df['trans_date_trans_time'].dt.day.astype('int8')
         self.df['trans_month_year'] = self.df['trans_date_trans_time'].dt.to_period('M')
         return self.df
-    
+
     def calculate_age(self):
         print("Calculating age")
         diff = self.df['trans_date_trans_time'] - self.df['dob']
-        self.df['age'] = diff.dt.days // 365
+        self.df['age'] = (diff.dt.days // 365).astype('int16')
         return self.df
-    
+
     def drop_unnecessary_columns(self):
         print("Cleaning unneeded columns")
         bad_cols = ['dob', 'first', 'last', 'street', 'trans_num', 'unix_time']
-        
-        for c in bad_cols:
-            self.df = self.df.drop(columns=[c])
-        
+
+        # one drop for all columns, some may not have been loaded
+        self.df = self.df.drop(columns=[c for c in bad_cols if c in self.df.columns])
+
+        return self.df
+
+    def compact_dtypes(self):
+        print("Compacting column types")
+        for c in CATEGORY_COLUMNS:
+            if c in self.df.columns and self.df[c].dtype != 'category':
+                self.df[c] = self.df[c].astype('category')
+
+        self.df['is_fraud'] = self.df['is_fraud'].astype('int8')
         return self.df
-    
+
     def clean_all(self):
         print("\n--- PREPROCESSING STARTED ---\n")
+        frame_before = get_frame_memory_mb(self.df)
+        rss_before = get_process_memory_mb()
+
         self.drop_unnamed_column()
         self.remove_duplicates()
         self.convert_datetime()
         self.extract_time_features()
         self.calculate_age()
         self.drop_unnecessary_columns()
+        self.compact_dtypes()
         print(f"Final size:{self.df.shape}")
+
+        print_memory_report("preprocessing", frame_before, get_frame_memory_mb(self.df), rss_before)
         print("\n--- PREPROCESSING FINISHED ---\n")
         return self.df
-
@@ -0,0 +1,286 @@
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_manager import DataManager
+
+try:
+    import pyarrow.parquet as pq # optional, needed for parquet sources
+except ImportError:
+    pq = None
+
+HLL_PRECISION = 14 # 16384 registers, standard error 1.04 / sqrt(16384) = 0.81%
+RELATIVE_ACCURACY = 0.01 # quantiles within 1% of the true value
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+def hash_values(values): # 64 bit hash per value, the same in every process and file
+    if isinstance(values.dtype, pd.CategoricalDtype): # hash the few categories once
+        return pd.util.hash_array(np.asarray(values.cat.categories, dtype=object))[values.cat.codes.to_numpy()]
+    arr = values.to_numpy()
+    return pd.util.hash_array(arr if arr.dtype.kind in 'iufbM' else arr.astype(object))
+
+
+class HyperLogLog:
+    # Distinct count sketch: every value is hashed, the first p bits pick a register and the
+    # register keeps the longest run of leading zeros seen in the other bits. 2^p bytes whatever
+    # the number of values, and two sketches merge by taking the register maxima.
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.p = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return self
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        bits = 64 - self.p
+        register = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # position of the highest set bit, exact for ints below 2^53 (frexp exponent = bit length)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (bits - bit_length + 1).astype(np.uint8) # leading zeros + 1, bits + 1 when rest is 0
+        np.maximum.at(self.registers, register, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge sketches with precision {self.p} and {other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros: # small counts: linear counting is more accurate
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self): # one standard error
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class QuantileSketch:
+    # Relative error quantile sketch (DDSketch style): values go into log spaced buckets,
+    # bucket i holds (gamma^(i-1), gamma^i], so any quantile comes back within RELATIVE_ACCURACY
+    # of the true value. Negative values use a mirrored set of buckets. Count, sum, min and max are
+    # kept exactly, and two sketches merge by adding their bucket counts.
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.alpha = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.positive = {} # bucket -> count
+        self.negative = {} # bucket of abs(value) -> count
+        self.zeros = 0
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.n += len(values)
+        self.total += values.sum()
+        self.total_sq += np.square(values).sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        self.zeros += int(np.count_nonzero(values == 0))
+        for store, part in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            buckets, counts = np.unique(np.ceil(np.log(part) / self.log_gamma).astype(np.int64), return_counts=True)
+            for b, c in zip(buckets.tolist(), counts.tolist()):
+                store[b] = store.get(b, 0) + c
+        return self
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f"Cannot merge sketches with accuracy {self.alpha} and {other.alpha}")
+        for store, o in ((self.positive, other.positive), (self.negative, other.negative)):
+            for b, c in o.items():
+                store[b] = store.get(b, 0) + c
+        self.zeros += other.zeros
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def bucket_value(self, b): # value with the same relative distance to both bucket ends
+        return 2 * self.gamma ** b / (self.gamma + 1)
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return [np.nan] * len(qs)
+
+        # buckets in value order: large negatives first, then zeros, then positives
+        neg = sorted(self.negative, reverse=True)
+        pos = sorted(self.positive)
+        values = np.array([-self.bucket_value(b) for b in neg] + [0.0] + [self.bucket_value(b) for b in pos])
+        counts = np.array([self.negative[b] for b in neg] + [self.zeros] + [self.positive[b] for b in pos])
+        cum = np.cumsum(counts)
+
+        ranks = np.asarray(qs) * (self.n - 1)
+        found = values[np.searchsorted(cum, ranks, side='right')]
+        return np.clip(found, self.min, self.max).tolist()
+
+    def mean(self):
+        return self.total / self.n if self.n else np.nan
+
+    def std(self): # sample std from the running sums, like describe()
+        if self.n < 2:
+            return np.nan
+        return float(np.sqrt(max(self.total_sq - self.total ** 2 / self.n, 0) / (self.n - 1)))
+
+
+def iter_source_chunks(path, chunk_rows=500_000, columns=None):
+    # a CSV or parquet file in chunks of rows, CSVs get the declared dtypes of DataManager
+    if path.endswith(".parquet") or os.path.isdir(path):
+        if pq is None:
+            raise ImportError("pyarrow is needed to read parquet files")
+        dataset = pq.ParquetDataset(path) if os.path.isdir(path) else None
+        files = dataset.files if dataset is not None else [path]
+        for file in files:
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows, columns=columns):
+                yield batch.to_pandas()
+    else:
+        yield from DataManager().read_csv_typed(path, columns, chunksize=chunk_rows)
+
+
+class DataSketch:
+    # Approximate exploration of a dataset that is read once, chunk by chunk: row and null counts
+    # (exact), distinct counts per column (HyperLogLog, about 0.8% standard error), and count / mean /
+    # std / min / max (exact) and quartiles (within 1%) per numeric column. Memory stays at a few
+    # hundred KB per column whatever the number of rows, and sketches of different files merge into
+    # the sketch of their union, so one sketch per file can be kept and combined later.
+
+    def __init__(self, hll_precision=HLL_PRECISION, relative_accuracy=RELATIVE_ACCURACY):
+        self.hll_precision = hll_precision
+        self.relative_accuracy = relative_accuracy
+        self.rows = 0
+        self.dtypes = {} # column -> dtype name
+        self.nulls = {}
+        self.distinct = {} # column -> HyperLogLog
+        self.numeric = {} # column -> QuantileSketch
+        self.sources = []
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            values = chunk[col]
+            missing = values.isna().to_numpy()
+            if col not in self.distinct:
+                self.dtypes[col] = str(values.dtype)
+                self.nulls[col] = 0
+                self.distinct[col] = HyperLogLog(self.hll_precision)
+            self.nulls[col] += int(missing.sum())
+
+            present = values[~missing] if missing.any() else values
+            self.distinct[col].add_hashes(hash_values(present))
+            if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+                if col not in self.numeric:
+                    self.numeric[col] = QuantileSketch(self.relative_accuracy)
+                self.numeric[col].add(present.to_numpy(dtype=np.float64))
+        return self
+
+    def add_file(self, path, chunk_rows=500_000, columns=None):
+        start = time.perf_counter()
+        rows_before = self.rows
+        for chunk in iter_source_chunks(path, chunk_rows, columns):
+            self.update(chunk)
+        self.sources.append(path)
+        print(f"Sketched {path}: {self.rows - rows_before} rows in {time.perf_counter() - start:.2f}s")
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.sources += other.sources
+        for col, hll in other.distinct.items():
+            if col in self.distinct:
+                self.distinct[col].merge(hll)
+                self.nulls[col] += other.nulls[col]
+            else:
+                self.distinct[col], self.nulls[col], self.dtypes[col] = hll, other.nulls[col], other.dtypes[col]
+        for col, qs in other.numeric.items():
+            if col in self.numeric:
+                self.numeric[col].merge(qs)
+            else:
+                self.numeric[col] = qs
+        return self
+
+    def summary(self):
+        return pd.DataFrame({
+            'dtype': pd.Series(self.dtypes),
+            'nulls': pd.Series(self.nulls),
+            'distinct_approx': pd.Series({c: h.count() for c, h in self.distinct.items()}),
+        })
+
+    def numeric_summary(self): # the describe() table, quartiles approximate
+        stats = {}
+        for col, qs in self.numeric.items():
+            q1, med, q3 = qs.quantiles(QUANTILES)
+            stats[col] = {'count': qs.n, 'mean': qs.mean(), 'std': qs.std(), 'min': qs.min,
+                          '25%': q1, '50%': med, '75%': q3, 'max': qs.max}
+        return pd.DataFrame(stats)
+
+    def error_bounds(self):
+        hll_error = 1.04 / np.sqrt(1 << self.hll_precision)
+        return (f"distinct counts: {hll_error:.2%} standard error (about {3 * hll_error:.1%} at 99.7%), "
+                f"quartiles: within {self.relative_accuracy:.0%} of the true value, "
+                f"rows, nulls, count, mean, std, min, max: exact")
+
+    def print_summary(self):
+        print(f"\nRows: {self.rows} (from {', '.join(self.sources) or 'data frames'})")
+        print(f"Total missing values: {sum(self.nulls.values())}")
+        print(f"\nColumns:\n{self.summary()}")
+        print(f"\nNumerical Stats (approximate):\n{self.numeric_summary()}")
+        print(f"\nError bounds: {self.error_bounds()}")
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"Sketch saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Approximate column statistics of CSV / parquet files, chunk by chunk")
+    parser.add_argument("paths", nargs="*", help="CSV or parquet files to sketch")
+    parser.add_argument("--merge", nargs="*", default=[], help="saved sketches to merge in")
+    parser.add_argument("--save", default=None, help="save the resulting sketch to this path")
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--columns", default=None, help="comma separated columns to sketch")
+    args = parser.parse_args()
+
+    sketch = DataSketch()
+    columns = args.columns.split(",") if args.columns else None
+    for path in args.paths:
+        sketch.add_file(path, args.chunk_rows, columns)
+    for path in args.merge:
+        sketch.merge(DataSketch.load(path))
+
+    sketch.print_summary()
+    if args.save:
+        sketch.save(args.save)
@@ -1,118 +1,254 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
 import seaborn as sns
 import pandas as pd
 
+AGE_BINS = [0, 30, 45, 60, 75, 120]
+AGE_LABELS = ['<30', '30-45', '46-60', '61-75', '>75']
+AMOUNT_BINS = 50
+KDE_POINTS = 1000 # the amount range is wide, a coarse grid shows as a jagged curve
+
+
+def sample_kde(sample, n_total, edges): # gaussian KDE (Scott's bandwidth) on a sample, scaled to the histogram counts
+    grid = np.linspace(edges[0], edges[-1], KDE_POINTS)
+    if len(sample) < 2 or sample.std() == 0:
+        return grid, np.zeros_like(grid)
+
+    bw = sample.std(ddof=1) * len(sample) ** (-1 / 5)
+    density = np.zeros_like(grid)
+    for part in np.array_split(sample, max(1, len(sample) // 5000)): # bounded memory for the grid x sample matrix
+        density += np.exp(-0.5 * ((grid[:, None] - part[None, :]) / bw) ** 2).sum(axis=1)
+    density /= len(sample) * bw * np.sqrt(2 * np.pi)
+    return grid, density * n_total * (edges[1] - edges[0])
+
+
+def box_stats(values, label): # what a boxplot draws, without keeping the rows
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {'label': label, 'q1': q1, 'med': med, 'q3': q3, 'whislo': inside.min(), 'whishi': inside.max(), 'fliers': []}
+
+
+# Renderers draw one figure from the aggregates only, so they can run in worker processes
+
+def render_fraud_distribution(agg, save_dir):
+    fig = plt.figure(figsize=(7, 7))
+    plt.pie(agg['fraud_counts'], labels=['Legit', 'Fraud'], autopct='%.1f%%', colors=['blue', 'red'])
+    plt.title('Fraudulent vs Non-Fraudulent Transactions %')
+    plt.savefig(f"{save_dir}/fraud_dist.png")
+    return fig
+
+
+def render_amount_dist(agg, save_dir):
+    fig = plt.figure(figsize=(16, 6))
+    for pos, (label, color, xmax) in enumerate([('Non-Fraud', 'blue', 1000), ('Fraud', 'red', 1500)]):
+        counts, edges, grid, kde = agg['amount_hist'][pos]
+        plt.subplot(1, 2, pos + 1)
+        plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color=color, alpha=0.5, edgecolor='white')
+        plt.plot(grid, kde, color=color)
+        plt.title(f'{label} Transaction Amount Distribution')
+        plt.xlabel('Amount (USD)')
+        plt.ylabel('Count')
+        plt.xlim(0, xmax)
+
+    plt.tight_layout()
+    plt.savefig(f"{save_dir}/amount_histogram.png")
+    return fig
+
+
+def render_amount_box(agg, save_dir):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    boxes = ax.bxp(agg['amount_box'], showfliers=False, patch_artist=True)
+    for patch, color in zip(boxes['boxes'], ['blue', 'red']):
+        patch.set_facecolor(color)
+
+    plt.ylim(0, 1000)
+    plt.ylabel('Amount (USD)')
+    plt.xlabel('Transaction status (0=Legit, 1=Fraud)')
+    plt.title('Transaction amounts: Legit vs Fraud')
+    plt.savefig(f"{save_dir}/amount_boxplot.png")
+    return fig
+
+
+def render_monthly_count(agg, save_dir):
+    months = agg['monthly_counts']
+    fig = plt.figure(figsize=(12, 6))
+    plt.bar(months.index, months.values, color=sns.color_palette('viridis', len(months)))
+    plt.title('Total Transactions per Month')
+    plt.xticks(rotation=45)
+    plt.ylabel('Count')
+    plt.savefig(f"{save_dir}/monthly_volume.png")
+    return fig
+
+
+def render_time_ratio(agg, save_dir):
+    hourly = agg['hourly_counts'] # 24 x 2, legit / fraud
+    fig = plt.figure(figsize=(12, 6))
+    hours = np.arange(24)
+    plt.bar(hours - 0.2, hourly[:, 0], width=0.4, color='blue', label='0')
+    plt.bar(hours + 0.2, hourly[:, 1], width=0.4, color='red', label='1')
+    plt.yscale("log") # log scale for visibility
+    plt.xticks(hours)
+    plt.xlabel('trans_hour')
+    plt.ylabel('count')
+    plt.legend(title='is_fraud')
+    plt.title('Hourly Transaction Patterns (Log Scale)')
+    plt.savefig(f"{save_dir}/time_patterns.png")
+    return fig
+
+
+def render_age_fraud_ratio(agg, save_dir):
+    fig = plt.figure(figsize=(10, 6))
+    agg['age_fraud_rate'].plot(kind='bar', color='red')
+    plt.title('Fraud Probability (%) by Age Group')
+    plt.ylabel('Fraud Rate (%)')
+    plt.savefig(f"{save_dir}/age_risk.png")
+    return fig
+
+
+def render_category_ratio(agg, save_dir):
+    fig = plt.figure(figsize=(12, 8))
+    agg['category_fraud_rate'].plot(kind='barh', color='red')
+    plt.xlim(0, 2.5)
+    plt.title('Fraud Rate (%) by Category')
+    plt.xlabel('Fraud Probability (%)')
+    plt.savefig(f"{save_dir}/category_risk.png")
+    return fig
+
+
+RENDERERS = [render_fraud_distribution, render_amount_dist, render_amount_box, render_monthly_count,
+             render_time_ratio, render_age_fraud_ratio, render_category_ratio]
+
+
+def render_file(renderer, agg, save_dir): # worker: draw and save one figure without a display
+    plt.switch_backend("Agg")
+    start = time.perf_counter()
+    plt.close(renderer(agg, save_dir))
+    return renderer.__name__, time.perf_counter() - start
+
+
 class DataVisualizer:
     sns.set_theme(style="whitegrid") #class level
 
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True, kde_sample=20000):
+        self.df = df.copy() if copy else df.copy(deep=False) # shallow copy shares the column data
         self.df['is_fraud'] = self.df['is_fraud'].astype(int)
 
         self.save_dir = "outputs/images"
+        self.kde_sample = kde_sample # rows per class used for the KDE curves
+        self.agg = None
 
-    def plot_fraud_distribution(self):
-        print("Visualizing fraud distribution")
-        f_counts = self.df['is_fraud'].value_counts()
+    def compute_aggregates(self):
+        # everything the charts need, a few KB, one pass per chart over the rows
+        fraud = self.df['is_fraud'].to_numpy()
+        amt = self.df['amt'].to_numpy(dtype=float)
+        rng = np.random.default_rng(0)
+        # sampled data (see sampler.py): rows count for their weight, so the charts show full data numbers
+        w = self.df['sample_weight'].to_numpy(dtype=float) if 'sample_weight' in self.df.columns else None
+        agg = {'fraud_counts': np.bincount(fraud, weights=w, minlength=2)}
+
+        agg['amount_hist'] = []
+        agg['amount_box'] = []
+        for label in (0, 1):
+            values = amt[fraud == label]
+            weights = w[fraud == label] if w is not None else None
+            if len(values) == 0: # keeps the charts drawable on data without fraud
+                values, weights = np.zeros(1), None
+            counts, edges = np.histogram(values, bins=AMOUNT_BINS, weights=weights)
+            sample = rng.choice(values, self.kde_sample, replace=False) if len(values) > self.kde_sample else values
+            n_total = weights.sum() if weights is not None else len(values)
+            agg['amount_hist'].append((counts, edges) + sample_kde(sample, n_total, edges))
+            agg['amount_box'].append(box_stats(values, str(label)))
+
+        months = self.df['trans_date_trans_time'].to_numpy().astype('datetime64[M]').view(np.int64)
+        month_counts = np.bincount(months - months.min(), weights=w)
+        observed = np.flatnonzero(month_counts)
+        labels = (months.min() + observed).astype('datetime64[M]').astype(str)
+        agg['monthly_counts'] = pd.Series(month_counts[observed], index=labels)
 
-        plt.figure(figsize=(7, 7))
+        hours = self.df['trans_hour'].to_numpy().astype(np.int64)
+        agg['hourly_counts'] = np.bincount(hours * 2 + fraud, weights=w, minlength=48).reshape(24, 2)
 
-        plt.pie(f_counts, labels=['Legit', 'Fraud'], autopct='%.1f%%', colors=['blue','red'])
-        plt.title('Fraudulent vs Non-Fraudulent Transactions %')
-        plt.savefig(f"{self.save_dir}/fraud_dist.png")
+        age_codes = pd.cut(self.df['age'], bins=AGE_BINS, labels=AGE_LABELS).cat.codes.to_numpy()
+        agg['age_fraud_rate'] = self.group_rate(age_codes, fraud, AGE_LABELS, w)
+
+        category = self.df['category'].astype('category')
+        rate = self.group_rate(category.cat.codes.to_numpy(), fraud, category.cat.categories, w)
+        agg['category_fraud_rate'] = rate.dropna().sort_values(ascending=False)
+
+        self.agg = agg
+        return agg
+
+    def group_rate(self, codes, fraud, labels, w=None): # fraud rate in % per group code, -1 = no group
+        keep = codes >= 0
+        w = w[keep] if w is not None else np.ones(keep.sum())
+        rows = np.bincount(codes[keep], weights=w, minlength=len(labels))
+        frauds = np.bincount(codes[keep], weights=fraud[keep] * w, minlength=len(labels))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(frauds / rows * 100, index=pd.Index(labels))
+
+    def aggregates(self):
+        return self.agg if self.agg is not None else self.compute_aggregates()
+
+    def show(self, renderer):
+        os.makedirs(self.save_dir, exist_ok=True)
+        renderer(self.aggregates(), self.save_dir)
         plt.show()
 
+    def plot_fraud_distribution(self):
+        print("Visualizing fraud distribution")
+        self.show(render_fraud_distribution)
+
     def plot_amount_dist(self):
         print("Visualizing amount distribution")
-        plt.figure(figsize=(16, 6))
-        
-        # Non-fraud amount distribution
-        plt.subplot(1, 2, 1)
-        sns.histplot(self.df[self.df['is_fraud'] == 0]['amt'], bins=50, color='blue', kde=True)
-        plt.title('Non-Fraud Transaction Amount Distribution')
-        plt.xlabel('Amount (USD)')
-        plt.xlim(0, 1000)
-
-        # Fraud amount distribution
-        plt.subplot(1, 2, 2)
-        sns.histplot(self.df[self.df['is_fraud'] == 1]['amt'], bins=50, color='red', kde=True)
-        plt.title('Fraud Transaction Amount Distribution')
-        plt.xlabel('Amount (USD)')
-        plt.xlim(0, 1500)
-        
-        plt.tight_layout()
-        plt.savefig(f"{self.save_dir}/amount_histogram.png")
-        plt.show()
+        self.show(render_amount_dist)
 
     def plot_amount_box(self):
         print("Visualizing Amount Inferences")
-        plt.figure(figsize=(10, 6))
-        
-        color_map = {0: 'blue', 1: 'red', '0': 'blue', '1': 'red'}
-        
-        sns.boxplot(data=self.df, x='is_fraud', y='amt', hue='is_fraud', palette=color_map, legend=False)
-        
-        plt.ylim(0, 1000) 
-        plt.ylabel('Amount (USD)')
-        plt.xlabel('Transaction status (0=Legit, 1=Fraud)')
-        plt.title('Transaction amounts: Legit vs Fraud')
-        plt.savefig(f"{self.save_dir}/amount_boxplot.png")
-        plt.show()
+        self.show(render_amount_box)
 
     def plot_monthly_count(self):
         print("Visualizing Monthly Transaction Volume")
-        monthly_data = self.df['trans_month_year'].astype(str)
-        
-        plt.figure(figsize=(12, 6))
-        sns.countplot(x=monthly_data.sort_values(), palette='viridis')
-        plt.title('Total Transactions per Month')
-        plt.xticks(rotation=45) 
-        plt.ylabel('Count')
-        plt.savefig(f"{self.save_dir}/monthly_volume.png")
-        plt.show()
+        self.show(render_monthly_count)
 
     def plot_time_ratio(self):
         print("Visualizing Time Patterns")
-        plt.figure(figsize=(12, 6))
-        sns.countplot(data=self.df, x='trans_hour', hue='is_fraud', palette={0: 'blue', 1: 'red'})
-        plt.yscale("log") # log scale for visibility
-        plt.title('Hourly Transaction Patterns (Log Scale)')
-        plt.savefig(f"{self.save_dir}/time_patterns.png")
-        plt.show()
-        
+        self.show(render_time_ratio)
 
     def plot_age_fraud_ratio(self):
         print("Visualizing age risk ratios")
-        bins = [0, 30, 45, 60, 75, 120]
-        labels = ['<30', '30-45', '46-60', '61-75', '>75']
-        
-        temp = self.df.copy()
-        temp['age_group'] = pd.cut(temp['age'], bins=bins, labels=labels)
-        
-        res = temp.groupby('age_group')['is_fraud'].mean() * 100
-        
-        plt.figure(figsize=(10, 6))
-        res.plot(kind='bar', color='red')
-        plt.title('Fraud Probability (%) by Age Group')
-        plt.ylabel('Fraud Rate (%)')
-        plt.savefig(f"{self.save_dir}/age_risk.png")
-        plt.show()
+        self.show(render_age_fraud_ratio)
 
     def plot_category_ratio(self):
         print("Visualizing category risk ratios")
+        self.show(render_category_ratio)
 
-        c_risk = self.df.groupby('category')['is_fraud'].mean() * 100
-        c_risk = c_risk.sort_values(ascending=False)
-        
-        plt.figure(figsize=(12, 8))
-        c_risk.plot(kind='barh', color='red')
-        plt.xlim(0, 2.5)
-        
-        plt.title('Fraud Rate (%) by Category')
-        plt.xlabel('Fraud Probability (%)')
-        plt.savefig(f"{self.save_dir}/category_risk.png")
-        plt.show()
+    def render_all(self, n_workers=None): # every chart to save_dir, no windows
+        print("\n--- RENDERING CHARTS STARTED ---\n")
+        start = time.perf_counter()
+        os.makedirs(self.save_dir, exist_ok=True)
+        agg = self.aggregates()
+        print(f"Aggregates computed in {time.perf_counter() - start:.2f}s")
 
+        n_workers = min(n_workers or os.cpu_count() or 1, len(RENDERERS))
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = [pool.submit(render_file, r, agg, self.save_dir) for r in RENDERERS]
+                timings = [f.result() for f in futures]
+        else:
+            backend = matplotlib.get_backend()
+            timings = [render_file(r, agg, self.save_dir) for r in RENDERERS]
+            plt.switch_backend(backend) # back to the interactive backend for the menu
+
+        for name, seconds in timings:
+            print(f"{name.replace('render_', ''):<20}{seconds:6.2f}s")
+        print(f"Rendered {len(RENDERERS)} charts to {self.save_dir} in {time.perf_counter() - start:.2f}s")
+        print("\n--- RENDERING CHARTS FINISHED ---\n")
 
 
     def visualize_all(self):
@@ -123,10 +259,11 @@ class DataVisualizer:
                 print("3. Time risk visualizations (hours & months)")
                 print("4. Age risk visualization")
                 print("5. Category risk visualization")
+                print("6. Render all charts to outputs/images (no windows)")
                 print("0. Back to main menu")
-                
+
                 choice = input("\nSelect visualization type: ")
-                
+
                 if choice == '1':
                     self.plot_fraud_distribution()
                 elif choice == '2':
@@ -139,7 +276,9 @@ class DataVisualizer:
                     self.plot_age_fraud_ratio()
                 elif choice == '5':
                     self.plot_category_ratio()
+                elif choice == '6':
+                    self.render_all()
                 elif choice == '0':
                     break
                 else:
-                    print("Invalid choice")        
\ No newline at end of file
+                    print("Invalid choice")
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+try:
+    import pyarrow as pa # optional, needed for parquet
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_EXPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "export.json")
+DEFAULT_SETTINGS = {'format': 'csv', 'compression': None, 'partition_by': None, 'flagged_only': False, 'columns': None}
+
+
+def load_export_config(path=None):
+    with open(path or DEFAULT_EXPORT_PATH) as f:
+        return json.load(f)
+
+
+def path_size(path): # bytes of a file, or of every file under a partitioned folder
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def partition_values(chunk, partition_by): # the partition key of every row of a chunk
+    if partition_by == 'month':
+        return chunk['trans_date_trans_time'].to_numpy().astype('datetime64[M]').astype(str)
+    if partition_by == 'risk_band':
+        col = 'risk_level' if 'risk_level' in chunk.columns else 'risk_band' # flagged rows / profiles
+        return chunk[col].astype(str).to_numpy()
+    raise ValueError(f"Unknown partition '{partition_by}', use 'month' or 'risk_band'")
+
+
+class Exporter:
+    # Writes pipeline outputs (flagged transactions, risk profiles) as CSV or compressed parquet,
+    # optionally partitioned by month or risk band, only flagged rows, or a column subset.
+    # Rows are written in chunks, so the export never holds a second full copy of the data,
+    # and every export reports its size and throughput. Settings per output come from config/export.json.
+
+    def __init__(self, config=None, path=None, output_dir=None):
+        self.config = config if config is not None else load_export_config(path)
+        self.output_dir = output_dir or self.config.get('output_dir', "outputs")
+        self.chunk_rows = self.config.get('chunk_rows', 500_000)
+        self.stats = [] # one entry per export
+
+    def settings(self, name, **overrides): # config of one output, arguments that are not None win
+        s = dict(DEFAULT_SETTINGS, **self.config.get(name, {}))
+        s.update({k: v for k, v in overrides.items() if v is not None})
+        if s['partition_by'] == 'none': # lets the command line turn off a configured partition
+            s['partition_by'] = None
+        if s['format'] == 'csv' and s['compression'] not in (None, 'gzip'): # parquet codecs (zstd, snappy) do not apply
+            s['compression'] = None
+        if s['format'] == 'parquet' and pq is None:
+            print("pyarrow is not installed, exporting CSV instead of parquet")
+            s['format'] = 'csv'
+        return s
+
+    def target_path(self, name, s):
+        if s['partition_by']:
+            return os.path.join(self.output_dir, name) # a folder with one sub folder per partition value
+        if s['format'] == 'parquet':
+            return os.path.join(self.output_dir, f"{name}.parquet")
+        return os.path.join(self.output_dir, f"{name}.csv" + (".gz" if s['compression'] == 'gzip' else ""))
+
+    def select(self, df, s):
+        if s['flagged_only'] and 'is_flagged' in df.columns:
+            df = df[df['is_flagged'].to_numpy() == 1]
+        return df
+
+    def chunk_columns(self, chunk, s): # column subset, the partition source column is only needed for the key
+        return chunk[[c for c in s['columns'] if c in chunk.columns]] if s['columns'] else chunk
+
+    def export(self, df, name, fmt=None, compression=None, partition_by=None, flagged_only=None, columns=None):
+        s = self.settings(name, format=fmt, compression=compression, partition_by=partition_by,
+                          flagged_only=flagged_only, columns=columns)
+        path = self.target_path(name, s)
+        start = time.perf_counter()
+
+        # replace the previous export of this output
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        df = self.select(df, s)
+        writer = None
+        try:
+            for i, begin in enumerate(range(0, len(df), self.chunk_rows)):
+                chunk = df.iloc[begin:begin + self.chunk_rows]
+                if s['partition_by']:
+                    self.write_partitioned(chunk, path, s, i)
+                elif s['format'] == 'parquet':
+                    table = pa.Table.from_pandas(self.chunk_columns(chunk, s), preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema, compression=s['compression'] or 'none')
+                    writer.write_table(table.cast(writer.schema))
+                else:
+                    self.chunk_columns(chunk, s).to_csv(path, mode="w" if i == 0 else "a", header=i == 0,
+                                                        index=False, compression=s['compression'])
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if len(df) == 0 and not os.path.exists(path): # nothing selected, still leave an (empty) output
+            if s['partition_by']:
+                os.makedirs(path)
+            elif s['format'] == 'parquet':
+                pq.write_table(pa.Table.from_pandas(self.chunk_columns(df, s), preserve_index=False), path)
+            else:
+                self.chunk_columns(df, s).to_csv(path, index=False)
+
+        return self.report(name, path, len(df), time.perf_counter() - start, s)
+
+    def write_partitioned(self, chunk, path, s, i):
+        keys = partition_values(chunk, s['partition_by'])
+        data = self.chunk_columns(chunk, s)
+        for key in np.unique(keys):
+            part = data[keys == key]
+            folder = os.path.join(path, f"{s['partition_by']}={key}") # hive style, readable by pandas / pyarrow / spark
+            os.makedirs(folder, exist_ok=True)
+            if s['format'] == 'parquet':
+                pq.write_table(pa.Table.from_pandas(part, preserve_index=False),
+                               os.path.join(folder, f"part-{i:05d}.parquet"), compression=s['compression'] or 'none')
+            else:
+                suffix = ".csv.gz" if s['compression'] == 'gzip' else ".csv"
+                part.to_csv(os.path.join(folder, f"part-{i:05d}{suffix}"), index=False, compression=s['compression'])
+
+    def report(self, name, path, rows, seconds, s):
+        size = path_size(path)
+        stats = {
+            'name': name,
+            'path': path,
+            'format': s['format'],
+            'partition_by': s['partition_by'],
+            'rows': rows,
+            'bytes': size,
+            'seconds': seconds,
+            'mb_per_s': size / 1024 ** 2 / seconds if seconds > 0 else None,
+            'rows_per_s': rows / seconds if seconds > 0 else None,
+        }
+        self.stats.append(stats)
+        rate = f"{stats['mb_per_s']:.1f} MB/s, {stats['rows_per_s']:.0f} rows/s" if seconds > 0 else "-"
+        print(f"Exported {rows} rows to {path} ({s['format']}): {size / 1024 ** 2:.1f} MB in {seconds:.2f}s ({rate})")
+        return stats
@@ -1,8 +1,16 @@
+import numpy as np
 import pandas as pd
 
+from geo_features import IMPOSSIBLE_SPEED_KMH, compute_geo_features, has_coordinates, radius_quantiles
+from group_stats import last_n_per_group, top_k_per_group
+from memory_utils import get_frame_memory_mb, get_process_memory_mb, print_memory_report
+
+LAST_N_WINDOWS = (3, 7, 30) # mean / max / std of each card's latest N amounts
+
 class FeatureEngineer:
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True):
+        # copy=False shares the column data with the caller instead of duplicating the frame
+        self.df = df.copy() if copy else df.copy(deep=False)
         self.customer_profiles = pd.DataFrame() # Dataframe to store each customer features
 
     def aggregate_spending(self):
@@ -19,49 +27,83 @@ class FeatureEngineer:
     def calculate_velocity(self):
         print("Calculating velocity")
         
-        self.df['t_date'] = self.df['trans_date_trans_time'].dt.date
-        active_days = self.df.groupby('cc_num')['t_date'].nunique() # count days of transaction
+        t_date = self.df['trans_date_trans_time'].dt.normalize() # day of transaction, kept out of the shared frame
+        active_days = t_date.groupby(self.df['cc_num']).nunique() # count days of transaction
         
         self.customer_profiles['days_active'] = self.customer_profiles['cc_num'].map(active_days)
         # divide count by days
         self.customer_profiles['daily_velocity'] = (self.customer_profiles['total_trans_count'] / self.customer_profiles['days_active'])
         return self.customer_profiles
 
-    def calculate_rolling_stats(self, window=5): # window is size of transactions
+    def calculate_rolling_stats(self, window=5, windows=LAST_N_WINDOWS): # window is size of transactions
             print(f"Calculating rolling statistics")
             
-            # Sort by date
-            temp_df = self.df.sort_values(['cc_num', 'trans_date_trans_time'])
-            
-            temp_df[f'rolling_avg_{window}'] = temp_df.groupby('cc_num')['amt'].rolling(window=window, min_periods=1).mean().reset_index(level=0, drop=True)
-            
-            latest_rolling = temp_df.groupby('cc_num')[f'rolling_avg_{window}'].last()
-            self.customer_profiles['recent_spending_trend'] = self.customer_profiles['cc_num'].map(latest_rolling)
+            # one sort by card and date, then only each card's last max(N) transactions are read
+            stats = last_n_per_group(self.df['cc_num'], self.df['trans_date_trans_time'], self.df['amt'],
+                                     sorted(set(windows) | {window}))
+
+            # same value as the last rolling(window) mean of the card
+            self.customer_profiles['recent_spending_trend'] = self.customer_profiles['cc_num'].map(stats[f'last_{window}_mean'])
+            for n in windows:
+                for stat in ('mean', 'max', 'std'):
+                    col = f'last_{n}_{stat}'
+                    self.customer_profiles[col] = self.customer_profiles['cc_num'].map(stats[col])
             
             return self.customer_profiles
 
     def calculate_behavioral_patterns(self):
             print("Extracting behavioral patterns")
             
-            # Find the  mode category for each person
-            most_freq_cat = self.df.groupby('cc_num')['category'].agg(lambda x: pd.Series.mode(x)[0])
-            self.customer_profiles['most_freq_category'] = self.customer_profiles['cc_num'].map(most_freq_cat)
-            
+            # Find the top 3 categories for each person, the first one is the mode
+            top_cats = top_k_per_group(self.df['cc_num'], self.df['category'], k=3)
+            self.customer_profiles['most_freq_category'] = self.customer_profiles['cc_num'].map(top_cats['top_1'])
+            self.customer_profiles['most_freq_category_share'] = self.customer_profiles['cc_num'].map(top_cats['top_1_share'])
+            self.customer_profiles['top_category_2'] = self.customer_profiles['cc_num'].map(top_cats['top_2'])
+            self.customer_profiles['top_category_3'] = self.customer_profiles['cc_num'].map(top_cats['top_3'])
+
             # Finding the most frequent hour for each person
-            most_freq_hour = self.df.groupby('cc_num')['trans_hour'].agg(lambda x: pd.Series.mode(x)[0])
-            self.customer_profiles['customer_peak_hour'] = self.customer_profiles['cc_num'].map(most_freq_hour)
-            
+            top_hours = top_k_per_group(self.df['cc_num'], self.df['trans_hour'], k=1)
+            self.customer_profiles['customer_peak_hour'] = self.customer_profiles['cc_num'].map(top_hours['top_1'])
+            self.customer_profiles['customer_peak_hour_share'] = self.customer_profiles['cc_num'].map(top_hours['top_1_share'])
+
+            return self.customer_profiles
+
+
+    def calculate_geo_profile(self):
+            if not has_coordinates(self.df): # loaded without the location columns
+                return self.customer_profiles
+            print("Calculating distance and travel profile")
+
+            # per transaction distances, kept out of the shared frame
+            geo = compute_geo_features(self.df['cc_num'], self.df['trans_date_trans_time'],
+                                       self.df['lat'], self.df['long'], self.df['merch_lat'], self.df['merch_long'])
+            by_card = pd.DataFrame(geo).groupby(self.df['cc_num'].to_numpy())
+
+            # typical radius around home, and the fastest move between two merchants
+            radius = radius_quantiles(self.df['cc_num'], geo['merch_dist_km']) # binned, as in ProfileStore
+            self.customer_profiles['home_radius_km'] = self.customer_profiles['cc_num'].map(radius[0.5])
+            self.customer_profiles['radius_p90_km'] = self.customer_profiles['cc_num'].map(radius[0.9])
+            self.customer_profiles['max_travel_speed_kmh'] = self.customer_profiles['cc_num'].map(by_card['travel_speed_kmh'].max())
+
+            impossible = pd.Series(geo['travel_speed_kmh'] > IMPOSSIBLE_SPEED_KMH).groupby(self.df['cc_num'].to_numpy()).sum()
+            self.customer_profiles['impossible_travel_count'] = self.customer_profiles['cc_num'].map(impossible).astype(np.int64)
+
             return self.customer_profiles
 
 
-    def build_all_features(self, rolling_window=5):
+    def build_all_features(self, rolling_window=5, show_sample=True):
         print("\n--- FEATURE ENGINEERING STARTED ---\n")        
+        frame_before = get_frame_memory_mb(self.df)
+        rss_before = get_process_memory_mb()
         self.aggregate_spending()
         self.calculate_velocity()
         self.calculate_rolling_stats(window=rolling_window) 
         self.calculate_behavioral_patterns() 
+        self.calculate_geo_profile()
         
         print("\nFeatures built for", len(self.customer_profiles), "cards: ")
-        print(self.customer_profiles.head())
+        if show_sample:
+            print(self.customer_profiles.head())
+        print_memory_report("feature engineering", frame_before, get_frame_memory_mb(self.df), rss_before)
         print("\n--- FEATURE ENGINEERING FINISHED ---\n")
         return self.customer_profiles    
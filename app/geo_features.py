@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+MIN_GAP_SECONDS = 60 # two transactions in the same minute count as a minute apart, keeps the speed finite
+IMPOSSIBLE_SPEED_KMH = 900 # faster than an airliner between two card present merchants
+RADIUS_BIN_KM = 1 # radius quantiles are read from merchant distances in 1 km bins, so running state stays small
+
+GEO_COLUMNS = ['merch_dist_km', 'travel_km', 'travel_speed_kmh']
+COORD_COLUMNS = ['lat', 'long', 'merch_lat', 'merch_long']
+
+
+def haversine_km(lat1, lon1, lat2, lon2): # great circle distance, element wise over arrays
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def compute_geo_features(cc_num, times, lat, long, merch_lat, merch_long):
+    # For every transaction: distance from the cardholder's home to the merchant, and distance and
+    # implied speed from the card's previous merchant. Rows are sorted once by (card, time), so
+    # the previous transaction of a card is simply the row before it in that order.
+    cc = np.asarray(cc_num)
+    secs = pd.to_datetime(times).to_numpy().astype('datetime64[s]').astype(np.int64)
+    m_lat = np.asarray(merch_lat, dtype=float)
+    m_long = np.asarray(merch_long, dtype=float)
+    n = len(cc)
+
+    result = {'merch_dist_km': haversine_km(lat, long, m_lat, m_long)}
+
+    order = np.lexsort((secs, cc)) # stable, ties keep the input order
+    cc_s, t_s, lat_s, long_s = cc[order], secs[order], m_lat[order], m_long[order]
+    new_card = np.ones(n, dtype=bool)
+    new_card[1:] = cc_s[1:] != cc_s[:-1]
+
+    travel = np.full(n, np.nan)
+    travel[1:] = haversine_km(lat_s[:-1], long_s[:-1], lat_s[1:], long_s[1:])
+    travel[new_card] = np.nan # first transaction of a card has no previous one
+
+    hours = np.full(n, np.nan)
+    hours[1:] = np.maximum(t_s[1:] - t_s[:-1], MIN_GAP_SECONDS) / 3600
+
+    for col, values in [('travel_km', travel), ('travel_speed_kmh', travel / hours)]:
+        out = np.empty(n)
+        out[order] = values # back to the input order
+        result[col] = out
+    return result
+
+
+def radius_bins(dist): # bin of every known merchant distance, and which distances are known
+    dist = np.asarray(dist, dtype=float)
+    known = ~np.isnan(dist)
+    return (dist[known] // RADIUS_BIN_KM).astype(np.int64), known
+
+
+def radius_quantiles(cc_num, dist, qs=(0.5, 0.9)):
+    # Per card quantiles of the merchant distance on RADIUS_BIN_KM bins: the middle of the bin holding
+    # the row at rank ceil(q * n). ProfileStore.radius_quantile gives the same value from its bin counts.
+    bins, known = radius_bins(dist)
+    cc = np.asarray(cc_num)[known]
+    order = np.lexsort((bins, cc))
+    cc, bins = cc[order], bins[order]
+
+    starts = np.flatnonzero(np.r_[True, cc[1:] != cc[:-1]]) if len(cc) else np.empty(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(cc)])
+    result = pd.DataFrame(index=cc[starts])
+    for q in qs:
+        rank = np.maximum(np.ceil(q * counts).astype(np.int64) - 1, 0)
+        result[q] = (bins[starts + rank] + 0.5) * RADIUS_BIN_KM
+    return result
+
+
+def has_coordinates(df):
+    return all(c in df.columns for c in COORD_COLUMNS)
+
+
+def add_geo_features(df, columns=None): # adds the columns in place, columns=None adds all
+    features = compute_geo_features(df['cc_num'], df['trans_date_trans_time'],
+                                    *(df[c] for c in COORD_COLUMNS))
+    for col, values in features.items():
+        if columns is None or col in columns:
+            df[col] = values
+    return df
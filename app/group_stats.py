@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+DENSE_COUNT_LIMIT = 50_000_000 # largest groups x values table counted with bincount, bigger ones are sorted instead
+
+
+def top_k_per_group(keys, values, k=1):
+    # Most frequent values of each group, worked out on integer codes instead of one mode() call per group.
+    # Ties are broken by the smaller value, same as pd.Series.mode(x)[0]. Missing values are ignored.
+    g_codes, g_uniques = pd.factorize(keys, sort=True)
+    v_codes, v_uniques = pd.factorize(values, sort=True) # sorted codes, so smaller code = smaller value
+    n_groups, n_vals = len(g_uniques), max(len(v_uniques), 1)
+
+    valid = v_codes >= 0
+    g_codes, v_codes = g_codes[valid], v_codes[valid]
+    group_totals = np.bincount(g_codes, minlength=n_groups)
+
+    # count every (group, value) pair
+    pair = g_codes.astype(np.int64) * n_vals + v_codes
+    if n_groups * n_vals <= DENSE_COUNT_LIMIT:
+        counts = np.bincount(pair, minlength=n_groups * n_vals)
+        pair = np.flatnonzero(counts)
+        counts = counts[pair]
+    else:
+        pair, counts = np.unique(pair, return_counts=True)
+    pair_group, pair_value = pair // n_vals, pair % n_vals
+
+    # inside each group: highest count first, then smallest value
+    order = np.lexsort((pair_value, -counts, pair_group))
+    pair_group, pair_value, counts = pair_group[order], pair_value[order], counts[order]
+
+    starts = np.flatnonzero(np.r_[True, pair_group[1:] != pair_group[:-1]])
+    rank = np.arange(len(pair_group)) - np.repeat(starts, np.diff(np.r_[starts, len(pair_group)]))
+
+    result = pd.DataFrame(index=pd.Index(g_uniques, name=getattr(keys, 'name', None)))
+    v_index = pd.Index(v_uniques)
+    for r in range(k):
+        sel = rank == r
+        pos = np.full(n_groups, -1)
+        pos[pair_group[sel]] = pair_value[sel]
+
+        share = np.full(n_groups, np.nan)
+        share[pair_group[sel]] = counts[sel] / group_totals[pair_group[sel]]
+
+        if (pos >= 0).all():
+            result[f'top_{r + 1}'] = v_index.take(pos)
+        else: # groups with fewer than r+1 distinct values get NaN (integer values become floats to hold it)
+            fillable = v_index.astype(float) if v_index.dtype.kind in 'iub' else v_index
+            result[f'top_{r + 1}'] = fillable.take(pos, allow_fill=True, fill_value=np.nan)
+        result[f'top_{r + 1}_share'] = share
+
+    return result
+
+
+def last_n_per_group(keys, order_by, values, windows=(3, 7, 30)):
+    # Mean, max and std of the last N values of each group (by order_by), for several N at once.
+    # One stable sort by (group, order_by), then only the last max(N) rows of every group are read,
+    # into a groups x max(N) matrix padded with NaN. Groups with fewer rows use the rows they have,
+    # like rolling(N, min_periods=1) at the last row. std is the sample std (NaN for one value).
+    name = getattr(keys, 'name', None)
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=float)
+    order = np.lexsort((np.asarray(order_by), keys))
+    keys_sorted = keys[order]
+
+    starts = np.flatnonzero(np.r_[True, keys_sorted[1:] != keys_sorted[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(keys)]
+    width = max(windows)
+
+    # row k of a group's tail is position end - width + k, positions before the group start are padding
+    pos = ends[:, None] - width + np.arange(width)[None, :]
+    inside = pos >= starts[:, None]
+    tail = np.where(inside, values[order][pos.clip(0)], np.nan) if len(keys) else np.empty((0, width))
+
+    result = pd.DataFrame(index=pd.Index(keys_sorted[starts], name=name))
+    for n in windows:
+        window = tail[:, width - n:]
+        count = inside[:, width - n:].sum(axis=1)
+        total = np.nansum(window, axis=1)
+        mean = total / count
+        sq_dev = np.nansum((window - mean[:, None]) ** 2, axis=1)
+
+        result[f'last_{n}_mean'] = mean
+        result[f'last_{n}_max'] = np.nanmax(window, axis=1) if len(window) else np.empty(0)
+        result[f'last_{n}_std'] = np.where(count > 1, np.sqrt(sq_dev / np.maximum(count - 1, 1)), np.nan)
+    return result
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from geo_features import COORD_COLUMNS
+from rule_engine import RuleEngine
+from scoring_service import ScoringServer, TransactionScorer
+from transaction_flagger import TransactionFlagger
+
+REPLAY_COLUMNS = ['cc_num', 'category', 'amt', 'trans_date_trans_time']
+
+
+def load_replay_rows(csv_path, n_rows): # coordinates too when the file has them, for the distance rules
+    wanted = set(REPLAY_COLUMNS + COORD_COLUMNS + ['is_fraud'])
+    rows = pd.read_csv(csv_path, usecols=lambda c: c in wanted, nrows=n_rows)
+    print(f"Replaying {len(rows)} rows from {csv_path}")
+    return rows
+
+
+def print_latency(label, latencies, n_txns, seconds):
+    lat = np.array(latencies) * 1000
+    print(f"\n{label}:")
+    print(f"Transactions: {n_txns}, time: {seconds:.2f}s, throughput: {n_txns / seconds:,.0f} txn/s")
+    print(f"Latency p50: {np.percentile(lat, 50):.3f} ms, p99: {np.percentile(lat, 99):.3f} ms")
+
+
+def run_api_test(scorer, txns, batch_size):
+    # single transactions
+    latencies = []
+    start = time.perf_counter()
+    for t in txns:
+        t0 = time.perf_counter()
+        scorer.score(t)
+        latencies.append(time.perf_counter() - t0)
+    print_latency("Python API, one transaction per call", latencies, len(txns), time.perf_counter() - start)
+
+    # micro-batches
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(txns), batch_size):
+        t0 = time.perf_counter()
+        scorer.score_batch(txns[i:i + batch_size])
+        latencies.append(time.perf_counter() - t0)
+    print_latency(f"Python API, batches of {batch_size}", latencies, len(txns), time.perf_counter() - start)
+
+
+async def run_http_test(scorer, txns, concurrency, max_batch, max_wait_ms):
+    server = ScoringServer(scorer, port=0, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    await server.start()
+    latencies = []
+
+    async def client(part): # one keep-alive connection sending rows one at a time
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        for t in part:
+            body = json.dumps(t).encode()
+            t0 = time.perf_counter()
+            writer.write(f"POST /score HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            await reader.readline() # status line
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(txns[i::concurrency]) for i in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    print_latency(f"HTTP, {concurrency} concurrent clients", latencies, len(txns), seconds)
+    print(f"Server metrics: {server.stats.summary()}")
+    await server.stop()
+
+
+def check_against_batch_rules(scorer, profiles, rows):
+    # The service must give the same flags and reasons as the batch flagger on the same rows.
+    # The batch run computes the history features (windows, travel) of the replayed rows, and the
+    # requests carry them, the way a caller of the service sends them. Returns those requests.
+    batch = rows.copy()
+    batch['trans_date_trans_time'] = pd.to_datetime(batch['trans_date_trans_time'])
+    batch['trans_hour'] = batch['trans_date_trans_time'].dt.hour
+    flagged = TransactionFlagger(batch, profiles, copy=False, rules=scorer.rules).flag_suspicious_activity(output_path=None)
+    masks = scorer.rules.flag_masks(flagged)
+    batch_reasons = [[name for name, mask in masks.items() if mask[i]] for i in range(len(flagged))]
+
+    txns = rows[REPLAY_COLUMNS].assign(**{c: flagged[c] for c in scorer.request_columns}).to_dict('records')
+    results = scorer.score_batch(txns)
+    flags = np.array([r['is_flagged'] for r in results])
+    differ = (flags != flagged['is_flagged'].to_numpy()) | np.array([r['reasons'] != b for r, b in zip(results, batch_reasons)])
+    print(f"\nService and batch flags agree: {not differ.any()} ({differ.sum()} of {len(txns)} rows differ)")
+    caught = ((flags == 1) & (rows['is_fraud'].to_numpy() == 1)).sum()
+    print(f"Flagged: {flags.sum()}, of which fraud: {caught}")
+    assert not differ.any(), f"service and batch flags differ on {differ.sum()} rows, e.g. row {np.flatnonzero(differ)[0]}"
+    return txns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the transaction scoring service")
+    parser.add_argument("--rules", default=None, help="rules config, defaults to config/rules.json")
+    parser.add_argument("--profiles", default="outputs/customer_risk_summary.csv")
+    parser.add_argument("--data", default="Data/fraudTest.csv", help="CSV with rows to replay")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=1.0)
+    parser.add_argument("--skip-http", action="store_true")
+    args = parser.parse_args()
+
+    profiles = pd.read_csv(args.profiles)
+    scorer = TransactionScorer(profiles, RuleEngine(path=args.rules))
+    rows = load_replay_rows(args.data, args.rows)
+
+    txns = check_against_batch_rules(scorer, profiles, rows)
+    run_api_test(scorer, txns, args.batch_size)
+    if not args.skip_http:
+        asyncio.run(run_http_test(scorer, txns, args.concurrency, args.max_batch, args.max_wait_ms))
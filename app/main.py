@@ -1,11 +1,14 @@
-from data_manager import DataManager
+import glob
+import os
+
 from data_explorator import DataExplorator
-from data_preprocessor import DataPreprocessor
 from data_visualizer import DataVisualizer 
-from feature_engineer import FeatureEngineer
-from risk_scorer_customer import RiskScorer
-from transaction_flagger import TransactionFlagger  
+from exporter import Exporter
 from report_generator import ReportGenerator
+from threshold_backtester import ThresholdBacktester
+from pipeline import FraudPipeline
+from sampler import Sampler
+from stage_profiler import StageProfiler
 
 raw_data = None
 clean_data = None
@@ -13,7 +16,11 @@ customer_profiles = None
 scored_profiles = None   
 flagged_df = None        
 
-dm = DataManager()
+pipeline = FraudPipeline() # stage results are cached in cache/stages
+exporter = Exporter() # formats and partitions from config/export.json
+
+# FRAUD_TRACE=outputs/stage_trace.json times every stage, the trace is written on exit
+profiler = StageProfiler(os.environ["FRAUD_TRACE"]).enable() if os.environ.get("FRAUD_TRACE") else None
 
 while True:
     print("\n   MAIN MENU   ")
@@ -26,6 +33,10 @@ while True:
     print("6. Customer risk scoring")
     print("7. Transaction fraud flagging")
     print("8. Final Report & Export")
+    print("9. Threshold backtest (precision/recall)")
+    print("10. Clear cached stage results")
+    print("11. Card investigation (per card queries)")
+    print("12. Compare rule configurations (champion / challenger)")
     print("0. Exit")
     
     user_input = input("\nChoose an option: ")
@@ -33,12 +44,25 @@ while True:
     if user_input == '1':
         path1 = "Data/fraudTrain.csv"
         path2 = "Data/fraudTest.csv"
-        res = dm.load_dataset(path1, path2)
+        mode = input("Sample for a quick run? [n]o / [f]raud preserving / [c]ards (default n): ").strip().lower()
+        if mode in ('f', 'c'):
+            try:
+                fraction = float(input("Share of legit rows / cards to keep (default 0.1): ") or 0.1)
+                pipeline.sampler = Sampler('fraud' if mode == 'f' else 'cards', fraction)
+            except ValueError as e:
+                print(f"Invalid sample settings ({e}), loading every row")
+                pipeline.sampler = None
+        else:
+            pipeline.sampler = None
+        res = pipeline.load(path1, path2)
         if res:
-            raw_data = dm.get_dataframe()
+            raw_data = pipeline.raw_data
         
     elif user_input == '2':
-        if raw_data is not None:
+        mode = input("Exact (loaded data) or approximate (sketches, read from the CSV files)? [e/a]: ").strip().lower()
+        if mode == 'a':
+            DataExplorator().explore_approximate(["Data/fraudTrain.csv", "Data/fraudTest.csv"])
+        elif raw_data is not None:
             exp = DataExplorator(raw_data)
             exp.explore_all()
         else:
@@ -46,51 +70,87 @@ while True:
 
     elif user_input == '3':
         if raw_data is not None:
-            cln = DataPreprocessor(raw_data)
-            clean_data = cln.clean_all()
+            clean_data = pipeline.clean()
         else:
             print("No data to clean!")
 
     elif user_input == '4':
         if clean_data is not None:
-            viz = DataVisualizer(clean_data)
+            viz = DataVisualizer(clean_data, copy=False)
             viz.visualize_all()
         else:
             print("Clean data first please")
 
     elif user_input == '5':
         if clean_data is not None:
-            fe = FeatureEngineer(clean_data)
-            customer_profiles = fe.build_all_features(rolling_window=7)
+            customer_profiles = pipeline.build_features(rolling_window=7)
         else:
             print("Clean data first")
 
     elif user_input == '6':
         if customer_profiles is not None:
-            scorer = RiskScorer(customer_profiles)
-            scorer.calculate_risk_scores()
-            scored_profiles = scorer.assign_risk_bands() 
+            scored_profiles = pipeline.score(output_path=None)
+            exporter.export(scored_profiles, "customer_risk_summary")
         else:
             print("Please run Feature Engineering (Option 5) first.")
 
     elif user_input == '7':
         if clean_data is not None and scored_profiles is not None:
-            flagger = TransactionFlagger(clean_data, scored_profiles)
-            flagger.flag_suspicious_activity()
-            flagger.calculate_performance()
-            flagged_df = flagger.get_flagged_data()
+            pipeline.flag(output_path=None)
+            pipeline.calculate_performance()
+            flagged_df = pipeline.get_flagged_data()
+            exporter.export(flagged_df, "flagged_transactions")
         else:
             print("Please run Risk Scoring (Option 6) first.")
 
     elif user_input == '8':
         if flagged_df is not None and scored_profiles is not None:
-            reporter = ReportGenerator(flagged_df, scored_profiles)
+            reporter = ReportGenerator(flagged_df, scored_profiles, pipeline.get_metrics())
             reporter.export_report_to_txt()
         else:
             print("\nPlease run steps Risk Scoring (Option 6), Transaction flagging (Option 7) first to export the data.")
 
+    elif user_input == '9':
+        if clean_data is not None and scored_profiles is not None:
+            backtester = ThresholdBacktester(clean_data, scored_profiles)
+            backtester.run()
+            backtester.export_results()
+            backtester.plot_pr_curve(show=True)
+        else:
+            print("Please run Risk Scoring (Option 6) first.")
+
+    elif user_input == '10':
+        stage = input("Stage to clear (clean, features, score, flag), empty for all: ").strip()
+        pipeline.cache.invalidate(stage or None)
+        print(pipeline.cache.summary())
+
+    elif user_input == '11':
+        if flagged_df is not None or clean_data is not None:
+            index = pipeline.card_index('flag' if flagged_df is not None else 'clean')
+            index.query_menu(scored_profiles)
+        else:
+            print("Clean data first")
+
+    elif user_input == '12':
+        if customer_profiles is not None:
+            paths = input("Candidate rule files, comma separated (default config/challengers/*.json): ").strip()
+            paths = [p.strip() for p in paths.split(",") if p.strip()] or sorted(glob.glob("config/challengers/*.json"))
+            if paths:
+                try:
+                    pipeline.compare_rules(paths).export()
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Could not compare the rules: {e}")
+            else:
+                print("No candidate rule files found")
+        else:
+            print("Please run Feature engineering (Option 5) first.")
+
     elif user_input == '0':
         print("Exit program.")
+        if profiler is not None:
+            profiler.disable()
+            profiler.print_summary()
+            profiler.write()
         break
     
     else:
@@ -0,0 +1,44 @@
+import os
+import sys
+
+try:
+    import psutil # optional, more accurate on every platform
+except ImportError:
+    psutil = None
+
+try:
+    import resource # not available on windows
+except ImportError:
+    resource = None
+
+
+def get_process_memory_mb(): # resident memory of this process
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2
+
+    try:
+        with open("/proc/self/statm") as f: # linux fallback, second field is resident pages
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return get_peak_memory_mb()
+
+
+def get_peak_memory_mb(): # highest resident memory seen so far
+    if resource is None:
+        return float('nan')
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin": # macOS reports bytes, linux reports KB
+        return peak / 1024 ** 2
+    return peak / 1024
+
+
+def get_frame_memory_mb(df): # deep size of a dataframe
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def print_memory_report(stage, frame_before_mb, frame_after_mb, rss_before_mb): # before/after footprint of one stage
+    rss_after_mb = get_process_memory_mb()
+    print(f"\nMemory ({stage}): dataframe {frame_before_mb:.1f} MB -> {frame_after_mb:.1f} MB, "
+          f"process {rss_before_mb:.1f} MB -> {rss_after_mb:.1f} MB")
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+SLICES = ['category', 'state', 'month', 'hour', 'risk_band']
+OUTCOMES = ['tn', 'fn', 'fp', 'tp'] # outcome code = 2 * flagged + fraud
+
+# slice name -> column of the flagged data, month is derived from the transaction time
+SLICE_COLUMNS = {
+    'category': 'category',
+    'state': 'state',
+    'month': 'trans_date_trans_time',
+    'hour': 'trans_hour',
+    'risk_band': 'risk_level',
+}
+
+
+def safe_ratio(num, den): # 0 instead of a division by zero (no fraud, nothing flagged)
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+
+def month_codes(times): # integer month offsets as codes, only the observed months get a label
+    months = times.to_numpy().astype('datetime64[M]')
+    known = ~np.isnat(months)
+    offsets = months[known].view(np.int64)
+    if len(offsets) == 0:
+        return np.full(len(months), -1, dtype=np.int64), pd.Index([], dtype=object)
+
+    first = offsets.min()
+    observed = np.bincount(offsets - first) > 0
+    remap = np.cumsum(observed) - 1 # month offset -> position among the observed months
+    codes = np.full(len(months), -1, dtype=np.int64)
+    codes[known] = remap[offsets - first]
+    labels = (first + np.flatnonzero(observed)).astype('datetime64[M]').astype(str)
+    return codes, pd.Index(labels, dtype=object)
+
+
+def slice_codes(col, values):
+    if col == 'trans_date_trans_time':
+        codes, labels = month_codes(values)
+    elif isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64) # categories already are the labels
+        labels = values.cat.categories
+    else:
+        codes, labels = pd.factorize(values, sort=True)
+
+    if (codes < 0).any(): # missing values get their own row
+        codes = np.where(codes < 0, len(labels), codes)
+        labels = labels.append(pd.Index(['(missing)']))
+    return codes, labels
+
+
+def weighted_counts(cell, weights, minlength): # rows per cell, scaled up to the full data for a sample
+    if weights is None:
+        return np.bincount(cell, minlength=minlength)
+    return np.rint(np.bincount(cell, weights=weights, minlength=minlength)).astype(np.int64)
+
+
+def finish_table(counts, money, labels=None):
+    table = pd.DataFrame(counts, columns=OUTCOMES, index=labels)
+    table['money_saved'] = money[:, 3] # amount of the caught frauds
+    table['money_missed'] = money[:, 1]
+    return add_rates(table)
+
+
+def add_rates(table):
+    table['rows'] = table[OUTCOMES].sum(axis=1)
+    table['fraud'] = table['tp'] + table['fn']
+    table['flagged'] = table['tp'] + table['fp']
+    table['recall'] = safe_ratio(table['tp'], table['fraud']) * 100
+    table['precision'] = safe_ratio(table['tp'], table['flagged']) * 100
+    return table
+
+
+class MetricsEngine:
+    # Confusion matrix and money caught of the flagged transactions, overall and per slice
+    # (category, state, month, hour, risk band). Every row gets one outcome code (TN/FN/FP/TP),
+    # and each breakdown is one bincount of slice code * 4 + outcome, with the amounts as weights,
+    # so the flagged data is not filtered again for every number.
+    # On sampled data (a sample_weight column, see sampler.py) every row counts for its weight,
+    # so counts and money are estimates of the full data.
+
+    def __init__(self, df=None, slices=None):
+        self.df = df
+        self.slice_names = slices if slices is not None else SLICES
+        self.slices = {} # slice name -> table indexed by slice value
+        self.overall = None
+        self.weighted = False
+
+    def compute(self):
+        flagged = self.df['is_flagged'].to_numpy() == 1
+        fraud = self.df['is_fraud'].to_numpy() == 1
+        outcome = flagged.astype(np.int64) * 2 + fraud
+        amt = self.df['amt'].to_numpy(dtype=float)
+        weights = self.df['sample_weight'].to_numpy(dtype=float) if 'sample_weight' in self.df.columns else None
+        if weights is not None:
+            amt = amt * weights
+        self.weighted = weights is not None
+
+        counts = weighted_counts(outcome, weights, 4)
+        money = np.bincount(outcome, weights=amt, minlength=4)
+        self.set_overall(counts, money)
+
+        for name in self.slice_names:
+            col = SLICE_COLUMNS[name]
+            if col not in self.df.columns:
+                continue
+            codes, labels = slice_codes(col, self.df[col])
+            cell = codes * 4 + outcome
+            n = len(labels) * 4
+            table = finish_table(weighted_counts(cell, weights, n).reshape(-1, 4),
+                                 np.bincount(cell, weights=amt, minlength=n).reshape(-1, 4), labels)
+            table.index.name = name
+            self.slices[name] = table[table['rows'] > 0] # unused categories
+        return self
+
+    def set_overall(self, counts, money):
+        o = dict(zip(OUTCOMES, (int(c) for c in counts)))
+        o['rows'] = sum(o[k] for k in OUTCOMES)
+        o['fraud'] = o['tp'] + o['fn']
+        o['flagged'] = o['tp'] + o['fp']
+        o['money_saved'] = float(money[3])
+        o['money_missed'] = float(money[1])
+        o['recall'] = float(safe_ratio(o['tp'], o['fraud'])) * 100
+        o['precision'] = float(safe_ratio(o['tp'], o['flagged'])) * 100
+        self.overall = o
+
+    def merge(self, other): # combine the metrics of two disjoint parts of the data (e.g. shards)
+        if self.overall is None:
+            return other
+
+        merged = MetricsEngine(slices=self.slice_names)
+        merged.weighted = self.weighted or other.weighted
+        counts = [self.overall[k] + other.overall[k] for k in OUTCOMES]
+        money = np.zeros(4)
+        money[1] = self.overall['money_missed'] + other.overall['money_missed']
+        money[3] = self.overall['money_saved'] + other.overall['money_saved']
+        merged.set_overall(counts, money)
+
+        for name in set(self.slices) | set(other.slices):
+            parts = [t[OUTCOMES + ['money_saved', 'money_missed']] for t in (self.slices.get(name), other.slices.get(name)) if t is not None]
+            table = parts[0].add(parts[1], fill_value=0) if len(parts) > 1 else parts[0].copy()
+            table[OUTCOMES] = table[OUTCOMES].astype(np.int64)
+            merged.slices[name] = add_rates(table.sort_index())
+        return merged
+
+    def top(self, name, n=5, by='flagged'): # e.g. the most flagged categories
+        return self.slices[name][by].sort_values(ascending=False, kind='stable').head(n).rename('count')
+
+    def print_summary(self):
+        o = self.overall
+        if self.weighted:
+            print("Sampled data: counts and money are weighted estimates of the full data")
+        print(f"Total rows:{o['rows']}")
+        print(f"Actual fraud (total fraud):{o['fraud']}")
+        print(f"Caught fraud (true positives):{o['tp']}")
+        print(f"Missed cases (false negatives):{o['fn']}")
+        print(f"False alarms (false positives):{o['fp']}")
+        print(f"Detection Rate(recall): {o['recall']:.2f}%")
+        print(f"Precision: {o['precision']:.2f}%")
+        print(f"Money saved from blocked frauds: ${o['money_saved']:.2f}")
@@ -0,0 +1,194 @@
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from feature_engineer import FeatureEngineer
+from rule_engine import RuleEngine
+from geo_features import COORD_COLUMNS
+from transaction_flagger import TransactionFlagger, compute_rule_columns
+
+FEATURE_COLUMNS = ['cc_num', 'amt', 'trans_date_trans_time', 'category', 'trans_hour']
+FLAG_COLUMNS = ['cc_num', 'amt', 'category', 'trans_hour']
+
+
+def put_shared(arr): # copy one column into shared memory, workers map it without pickling
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def attach_shared(spec):
+    name, shape, dtype = spec
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False) # python 3.13+, the parent owns the block
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name) # pool workers share the parent's resource tracker
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def attach_columns(specs, start, end, categories):
+    blocks, cols = [], {}
+    for col, spec in specs.items():
+        shm, arr = attach_shared(spec)
+        blocks.append(shm)
+        cols[col] = arr[start:end]
+
+    df = pd.DataFrame({
+        'cc_num': cols['cc_num'],
+        'amt': cols['amt'],
+        'category': pd.Categorical.from_codes(cols['category'], categories=categories),
+        'trans_hour': cols['trans_hour'],
+    })
+    if 'trans_date_trans_time' in cols:
+        df['trans_date_trans_time'] = cols['trans_date_trans_time'].view('datetime64[ns]')
+    for col in cols: # rule columns computed in the parent, they need all rows of a card
+        if col not in df.columns:
+            df[col] = cols[col]
+    return blocks, df
+
+
+def feature_worker(specs, start, end, categories, rolling_window):
+    blocks, df = attach_columns(specs, start, end, categories)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): # the stage prints would interleave between workers
+            return FeatureEngineer(df, copy=False).build_all_features(rolling_window=rolling_window)
+    finally:
+        del df
+        for shm in blocks:
+            shm.close()
+
+
+def flag_worker(specs, start, end, categories, profiles, rules_config, out_spec):
+    blocks, df = attach_columns(specs, start, end, categories)
+    out_shm, out = attach_shared(out_spec)
+    try:
+        df['risk_level'] = df['cc_num'].map(profiles['risk_band'])
+        df['cust_avg'] = df['cc_num'].map(profiles['avg_transaction'])
+        out[start:end] = RuleEngine(config=rules_config).flag(df) # results go straight into the shared output
+    finally:
+        del df, out
+        for shm in blocks + [out_shm]:
+            shm.close()
+
+
+class ParallelEngine:
+    # Splits cards (for features) or rows (for flagging) across a process pool.
+    # Columns are passed through shared memory, categories as integer codes, and
+    # results are merged in card / row order so the output does not depend on the worker count.
+
+    def __init__(self, n_workers=None, tasks_per_worker=4):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.tasks_per_worker = tasks_per_worker # smaller tasks even out the load between workers
+
+    def share_columns(self, df, columns, extra=None):
+        blocks, specs = [], {}
+        for col in columns + list(extra or {}):
+            if extra and col in extra:
+                arr = extra[col]
+            elif col == 'category':
+                arr = pd.Categorical(df[col]).codes
+            elif col == 'trans_date_trans_time':
+                arr = df[col].to_numpy().astype('datetime64[ns]').view(np.int64)
+            else:
+                arr = df[col].to_numpy()
+            shm, specs[col] = put_shared(np.ascontiguousarray(arr))
+            blocks.append(shm)
+        return blocks, specs
+
+    def release(self, blocks):
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    def card_ranges(self, cc_sorted): # row ranges that never split a card
+        n_tasks = self.n_workers * self.tasks_per_worker
+        targets = np.linspace(0, len(cc_sorted), n_tasks + 1).astype(np.int64)[1:-1]
+        cuts = np.searchsorted(cc_sorted, cc_sorted[targets], side='left') if len(targets) else []
+        bounds = np.unique(np.r_[0, cuts, len(cc_sorted)])
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def row_ranges(self, n_rows):
+        bounds = np.unique(np.linspace(0, n_rows, self.n_workers * self.tasks_per_worker + 1).astype(np.int64))
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def build_features(self, clean_df, rolling_window=5):
+        print(f"Building features with {self.n_workers} workers")
+        # group each card's rows together, stable so rows keep their order inside a card
+        order = np.argsort(clean_df['cc_num'].to_numpy(), kind='stable')
+        columns = FEATURE_COLUMNS + [c for c in COORD_COLUMNS if c in clean_df.columns] # coordinates for the radius profile
+        sorted_df = clean_df[columns].iloc[order]
+        categories = pd.Categorical(sorted_df['category']).categories
+        blocks, specs = self.share_columns(sorted_df, columns)
+        try:
+            ranges = self.card_ranges(sorted_df['cc_num'].to_numpy())
+            with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+                futures = [pool.submit(feature_worker, specs, s, e, categories, rolling_window) for s, e in ranges]
+                parts = [f.result() for f in futures] # in card order
+        finally:
+            self.release(blocks)
+
+        return pd.concat(parts, ignore_index=True)
+
+    def flag(self, clean_df, scored_profiles, rules=None):
+        print(f"Flagging transactions with {self.n_workers} workers")
+        rules = rules if rules is not None else RuleEngine()
+        profiles = scored_profiles.set_index('cc_num')[['risk_band', 'avg_transaction']]
+        categories = pd.Categorical(clean_df['category']).categories
+        # row ranges split cards, so window and travel features are computed here over all rows
+        needed = sorted(rules.flag_plan.columns() - set(clean_df.columns) - {'risk_level', 'cust_avg'})
+        extra = compute_rule_columns(clean_df, scored_profiles, needed)
+        blocks, specs = self.share_columns(clean_df, FLAG_COLUMNS, extra)
+        out_shm, out_spec = put_shared(np.zeros(len(clean_df), dtype=bool))
+        try:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+                futures = [pool.submit(flag_worker, specs, s, e, categories, profiles, rules.config, out_spec)
+                           for s, e in self.row_ranges(len(clean_df))]
+                for f in futures:
+                    f.result()
+            flags = np.ndarray(len(clean_df), dtype=bool, buffer=out_shm.buf).astype('int8')
+        finally:
+            self.release(blocks + [out_shm])
+
+        return flags
+
+    def report_speedup(self, clean_df, scored_profiles, worker_counts=None, rolling_window=5):
+        print("\n--- PARALLEL SPEEDUP STARTED ---\n")
+        worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count() or 1})
+
+        # serial baselines: the FeatureEngineer and TransactionFlagger runs the workers replace
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            FeatureEngineer(clean_df, copy=False).build_all_features(rolling_window=rolling_window)
+            serial_features = time.perf_counter() - start
+            start = time.perf_counter()
+            TransactionFlagger(clean_df, scored_profiles, copy=False).flag_suspicious_activity(output_path=None)
+            serial_flagging = time.perf_counter() - start
+
+        rows = []
+        for n in worker_counts:
+            engine = ParallelEngine(n, self.tasks_per_worker)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                engine.build_features(clean_df, rolling_window)
+                features = time.perf_counter() - start
+                start = time.perf_counter()
+                engine.flag(clean_df, scored_profiles)
+                flagging = time.perf_counter() - start
+            rows.append({'workers': n,
+                         'features_s': features, 'features_speedup': serial_features / features,
+                         'features_efficiency': serial_features / features / n,
+                         'flagging_s': flagging, 'flagging_speedup': serial_flagging / flagging,
+                         'flagging_efficiency': serial_flagging / flagging / n})
+
+        report = pd.DataFrame(rows)
+        print(f"Serial feature engineering: {serial_features:.2f}s, serial flagging: {serial_flagging:.2f}s "
+              f"on {len(clean_df)} rows, {os.cpu_count()} cpus available")
+        print(report.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+        print("\n--- PARALLEL SPEEDUP FINISHED ---\n")
+        return report
@@ -0,0 +1,194 @@
+import contextlib
+import io
+import math
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_manager import DataManager, feather
+from data_preprocessor import DataPreprocessor
+from feature_engineer import FeatureEngineer
+from memory_utils import get_peak_memory_mb
+from metrics_engine import MetricsEngine
+from risk_scorer_customer import RiskScorer
+from transaction_flagger import TransactionFlagger
+
+MEMORY_PER_CSV_BYTE = 2.5 # rough peak memory of cleaning + features per byte of CSV input
+ROW_ID = 'row_id' # position of the row in the concatenated input, keeps the in-memory order
+SHARD_KINDS = ['raw', 'clean', 'flagged'] # subfolders of the work dir, one per stage output
+WORK_DIR_MARKER = ".partitioned_pipeline" # only a work dir holding this file gets its shards cleared
+
+
+class PartitionedPipeline:
+    # Runs load -> clean -> features -> score -> flag for inputs larger than RAM.
+    # The CSVs are streamed in chunks and split by a hash of cc_num into on-disk shards,
+    # so every card lives in exactly one shard and per-card features stay exact.
+    # Only the customer scoring, which needs all cards, runs on the (small) combined profiles.
+
+    def __init__(self, work_dir="cache/partitions", memory_limit_mb=1024, n_shards=None, chunk_rows=None,
+                 rolling_window=7, rules=None, verbose=False):
+        if feather is None:
+            raise ImportError("The partitioned pipeline needs pyarrow to write shards")
+
+        self.dm = DataManager()
+        self.work_dir = work_dir
+        self.memory_limit = memory_limit_mb * 1024 ** 2
+        self.n_shards = n_shards
+        self.chunk_rows = chunk_rows
+        self.rolling_window = rolling_window
+        self.rules = rules
+        self.verbose = verbose # print the output of every stage for every shard
+        self.scored_profiles = None
+        self.metrics = None
+
+    def plan(self, paths): # number of shards and chunk size that keep each step under the memory limit
+        csv_bytes = sum(os.path.getsize(p) for p in paths)
+        if self.n_shards is None:
+            self.n_shards = max(1, math.ceil(csv_bytes * MEMORY_PER_CSV_BYTE / self.memory_limit))
+
+        if self.chunk_rows is None:
+            with open(paths[0], "rb") as f:
+                sample = f.read(1024 ** 2)
+            bytes_per_row = len(sample) / max(sample.count(b"\n"), 1)
+            self.chunk_rows = max(1000, int(self.memory_limit / (bytes_per_row * MEMORY_PER_CSV_BYTE * 4)))
+
+        print(f"Input: {csv_bytes / 1024 ** 2:.1f} MB, memory limit: {self.memory_limit / 1024 ** 2:.0f} MB")
+        print(f"Shards: {self.n_shards}, chunk size: {self.chunk_rows} rows")
+
+    def shard_dir(self, kind, shard):
+        return os.path.join(self.work_dir, kind, f"shard_{shard:04d}")
+
+    def prepare_work_dir(self): # clears the shards of an earlier run, never other files
+        marker = os.path.join(self.work_dir, WORK_DIR_MARKER)
+        if os.path.isdir(self.work_dir) and os.listdir(self.work_dir) and not os.path.exists(marker):
+            raise ValueError(f"{self.work_dir} is not empty and was not created by the partitioned pipeline, "
+                             f"pick an empty or new --work-dir")
+        for kind in SHARD_KINDS:
+            shutil.rmtree(os.path.join(self.work_dir, kind), ignore_errors=True)
+        os.makedirs(self.work_dir, exist_ok=True)
+        open(marker, "w").close()
+
+    def partition(self, paths):
+        print("\n--- PARTITIONING STARTED ---\n")
+        self.prepare_work_dir()
+        row_offset = 0
+        part = 0
+
+        for path in paths:
+            print(f"Streaming {path}")
+            for chunk in self.dm.read_csv_typed(path, chunksize=self.chunk_rows):
+                chunk[ROW_ID] = np.arange(row_offset, row_offset + len(chunk), dtype=np.int64)
+                row_offset += len(chunk)
+
+                shard_ids = pd.util.hash_array(chunk['cc_num'].to_numpy()) % self.n_shards
+                for shard, rows in chunk.groupby(shard_ids, sort=False):
+                    folder = self.shard_dir("raw", shard)
+                    os.makedirs(folder, exist_ok=True)
+                    feather.write_feather(rows.reset_index(drop=True), os.path.join(folder, f"part_{part:06d}.arrow"))
+                part += 1
+
+        print(f"Partitioned {row_offset} rows into {self.n_shards} shards")
+        print("\n--- PARTITIONING FINISHED ---\n")
+
+    def read_shard(self, kind, shard):
+        folder = self.shard_dir(kind, shard)
+        if not os.path.exists(folder):
+            return None
+
+        parts = [feather.read_table(os.path.join(folder, name)).to_pandas() for name in sorted(os.listdir(folder))]
+        df = self.dm.concat_frames(parts) if len(parts) > 1 else parts[0]
+        return df.set_index(ROW_ID) # same row labels as the in-memory path
+
+    def write_shard(self, df, kind, shard):
+        folder = self.shard_dir(kind, shard)
+        os.makedirs(folder, exist_ok=True)
+        feather.write_feather(df.reset_index(), os.path.join(folder, "part_000000.arrow"))
+
+    def stage_output(self): # silence the per-shard prints of the stage classes unless verbose
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def build_features(self):
+        print("\n--- SHARD CLEANING & FEATURES STARTED ---\n")
+        profiles = []
+        for shard in range(self.n_shards):
+            raw = self.read_shard("raw", shard)
+            if raw is None:
+                continue
+
+            with self.stage_output():
+                clean = DataPreprocessor(raw, copy=False).clean_all()
+                profiles.append(FeatureEngineer(clean, copy=False).build_all_features(rolling_window=self.rolling_window))
+            self.write_shard(clean, "clean", shard)
+            print(f"Shard {shard}: {len(clean)} rows, {len(profiles[-1])} cards")
+
+        # same card order as the groupby of the in-memory path
+        customer_profiles = pd.concat(profiles, ignore_index=True).sort_values('cc_num').reset_index(drop=True)
+        print("\n--- SHARD CLEANING & FEATURES FINISHED ---\n")
+        return customer_profiles
+
+    def score(self, customer_profiles):
+        scorer = RiskScorer(customer_profiles, self.rules)
+        scorer.calculate_risk_scores()
+        self.scored_profiles = scorer.assign_risk_bands(output_path=None) # returned by run(), nothing written to the working directory
+        return self.scored_profiles
+
+    def flag(self):
+        print("\n--- SHARD FLAGGING STARTED ---\n")
+        metrics = MetricsEngine()
+
+        for shard in range(self.n_shards):
+            clean = self.read_shard("clean", shard)
+            if clean is None:
+                continue
+
+            with self.stage_output():
+                flagger = TransactionFlagger(clean, self.scored_profiles, copy=False, rules=self.rules)
+                flagged = flagger.flag_suspicious_activity(output_path=None)
+            self.write_shard(flagged, "flagged", shard)
+
+            metrics = metrics.merge(MetricsEngine(flagged).compute()) # shards hold disjoint rows, counts add up
+
+        self.metrics = metrics
+        metrics.print_summary()
+        print("\nTop flagged categories")
+        print(metrics.top('category', 5))
+        print("\n--- SHARD FLAGGING FINISHED ---\n")
+        return metrics.overall
+
+    def run(self, paths):
+        start = time.perf_counter()
+        self.plan(paths)
+        self.partition(paths)
+        self.score(self.build_features())
+        self.flag()
+        print(f"Partitioned pipeline finished in {time.perf_counter() - start:.1f}s, peak memory {get_peak_memory_mb():.0f} MB")
+        return self.scored_profiles, self.metrics.overall
+
+    def iter_flagged(self): # flagged shards one at a time, for exports that do not fit in memory
+        for shard in range(self.n_shards):
+            df = self.read_shard("flagged", shard)
+            if df is not None:
+                yield df
+
+    def collect_flagged(self): # all flagged rows in input order, only when they fit in memory
+        frames = [df.reset_index() for df in self.iter_flagged()]
+        return self.dm.concat_frames(frames).set_index(ROW_ID).sort_index()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the pipeline shard by shard with bounded memory")
+    parser.add_argument("paths", nargs="+", help="input CSV files")
+    parser.add_argument("--memory-limit-mb", type=int, default=1024)
+    parser.add_argument("--shards", type=int, default=None, help="defaults to a count derived from the memory limit")
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--work-dir", default="cache/partitions")
+    parser.add_argument("--rolling-window", type=int, default=7)
+    args = parser.parse_args()
+
+    pipeline = PartitionedPipeline(args.work_dir, args.memory_limit_mb, args.shards, args.chunk_rows, args.rolling_window)
+    pipeline.run(args.paths)
@@ -0,0 +1,162 @@
+import os
+
+from card_index import CardIndex
+from data_manager import DataManager, SCHEMA_VERSION
+from data_preprocessor import DataPreprocessor, dedup_column, dedup_hashes
+from feature_engineer import FeatureEngineer
+from parallel_engine import ParallelEngine
+from risk_scorer_customer import RiskScorer
+from rule_comparison import RuleComparison, load_challengers
+from rule_engine import RuleEngine
+from stage_cache import StageCache, fingerprint_files, fingerprint_frame
+from transaction_flagger import TransactionFlagger
+
+# bump a stage's version when its code changes what it outputs, so older cached results are not used
+STAGE_VERSIONS = {
+    'clean': 2,
+    'features': 4,
+    'score': 1,
+    'flag': 1,
+}
+
+
+class FraudPipeline:
+    # The main.py stages with an on-disk cache between them. Every stage result is stored
+    # under a key built from the input files, the stage parameters and the rules it uses,
+    # so after a rule change only scoring and / or flagging run again.
+
+    def __init__(self, cache=None, rules=None, use_cache=True, n_workers=1, dedup_key='trans_num', seen_keys=None,
+                 sampler=None):
+        self.dm = DataManager()
+        self.cache = cache if cache is not None else StageCache()
+        self.fixed_rules = rules # None reads config/rules.json at every scoring / flagging run
+        self.rules = None
+        self.use_cache = use_cache
+        self.n_workers = n_workers # more than 1 builds features on a process pool, same result
+        self.dedup_key = dedup_key # None compares full rows
+        self.seen_keys = seen_keys # SeenKeys of earlier runs, for appended files
+        self.sampler = sampler # Sampler for quick runs on part of the data, None uses every row
+
+        self.raw_data = None
+        self.clean_data = None
+        self.customer_profiles = None
+        self.scored_profiles = None
+        self.flagger = None
+        self.keys = {} # stage -> key of its current result
+
+    def load_rules(self): # picks up edits of the rules file without restarting
+        self.rules = self.fixed_rules if self.fixed_rules is not None else RuleEngine()
+        return self.rules
+
+    def cached(self, stage, params, inputs, compute):
+        key = self.cache.make_key(stage, [params, STAGE_VERSIONS[stage]], *inputs)
+        result = self.cache.load(stage, key) if self.use_cache else None
+        if result is None:
+            result = compute()
+            if self.use_cache:
+                self.cache.save(stage, key, result)
+        self.keys[stage] = key
+        return result
+
+    def set_raw_data(self, df): # data that did not come from load(), keyed on its content
+        self.keys['load'] = fingerprint_frame(df)
+        self.raw_data = self.sample(df)
+
+    def sample(self, df):
+        if self.sampler is None:
+            return df
+        # a sample is keyed like different input data, so its stage results never mix with the full ones
+        self.keys['load'] = self.cache.make_key('load', self.sampler.params(), self.keys['load'])
+        return self.sampler.apply(df)
+
+    def load(self, path1, path2=None):
+        paths = [path1, path2] if path2 else [path1]
+        if not self.dm.load_dataset(path1, path2): # has its own arrow cache of the parsed CSVs
+            return False
+
+        self.keys['load'] = self.cache.make_key('load', SCHEMA_VERSION, fingerprint_files(paths))
+        self.raw_data = self.sample(self.dm.get_dataframe())
+        return True
+
+    def clean(self):
+        def compute():
+            return DataPreprocessor(self.raw_data, copy=False, dedup_key=self.dedup_key, seen_keys=self.seen_keys).clean_all()
+
+        # the seen keys change the result, so their saved state is part of the key. Cleaning only reads
+        # them, record_seen_keys adds this load once the run has finished.
+        params = {'dedup_key': self.dedup_key, 'seen_keys': self.seen_keys.state() if self.seen_keys is not None else None}
+        self.clean_data = self.cached('clean', params, [self.keys['load']], compute)
+        return self.clean_data
+
+    def record_seen_keys(self):
+        # keys of every loaded row join the history, so the next run drops them. Duplicates and rows
+        # seen before hash to keys the history gets anyway, so the raw data gives the same store.
+        if self.seen_keys is None or self.raw_data is None:
+            return
+        self.seen_keys.add(dedup_hashes(self.raw_data, dedup_column(self.raw_data, self.dedup_key)))
+        self.seen_keys.save()
+
+    def build_features(self, rolling_window=7, show_sample=True):
+        def compute():
+            if self.n_workers > 1:
+                return ParallelEngine(self.n_workers).build_features(self.clean_data, rolling_window)
+            return FeatureEngineer(self.clean_data, copy=False).build_all_features(rolling_window, show_sample)
+
+        self.customer_profiles = self.cached('features', {'rolling_window': rolling_window}, [self.keys['clean']], compute)
+        return self.customer_profiles
+
+    def score(self, output_path="customer_risk_summary.csv", show_sample=True):
+        rules = self.load_rules()
+
+        def compute():
+            scorer = RiskScorer(self.customer_profiles, rules)
+            scorer.calculate_risk_scores()
+            return scorer.assign_risk_bands(output_path, show_sample)
+
+        # only the scoring part of the rules, a flag rule change keeps this result
+        params = {'customer_scoring': rules.config['customer_scoring'], 'lists': rules.config.get('lists', {})}
+        self.scored_profiles = self.cached('score', params, [self.keys['features']], compute)
+        return self.scored_profiles
+
+    def flag(self, output_path="flagged_transactions.csv"):
+        rules = self.load_rules()
+        self.flagger = TransactionFlagger(self.clean_data, self.scored_profiles, copy=False, rules=rules)
+
+        def compute(): # risk_level, cust_avg, is_flagged and the rule columns (e.g. travel_speed_kmh)
+            flagged = self.flagger.flag_suspicious_activity(output_path)
+            return flagged[[c for c in flagged.columns if c not in self.clean_data.columns]]
+
+        # the added columns only, the clean data itself is already cached
+        params = {'transaction_flagging': rules.config['transaction_flagging'], 'lists': rules.config.get('lists', {})}
+        added = self.cached('flag', params, [self.keys['clean'], self.keys['score']], compute)
+
+        if self.flagger.results_df is None: # cached result, put the columns back on the clean data
+            for col in added.columns:
+                self.flagger.df[col] = added[col]
+            self.flagger.results_df = self.flagger.df
+        return self.flagger.results_df
+
+    def compare_rules(self, challenger_paths):
+        # the current rules against candidate rule files, on the clean data and profiles already built
+        comparison = RuleComparison(self.clean_data, self.customer_profiles, self.load_rules(), load_challengers(challenger_paths))
+        comparison.run()
+        return comparison
+
+    def calculate_performance(self):
+        return self.flagger.calculate_performance()
+
+    def get_metrics(self): # aggregates of the last calculate_performance, for the report
+        return self.flagger.metrics if self.flagger is not None else None
+
+    def card_index(self, stage='flag', index_dir="cache/card_index"):
+        # per card index of the flagged (or clean) data, reused while that stage result is unchanged
+        df = self.get_flagged_data() if stage == 'flag' else self.clean_data
+        path = os.path.join(index_dir, f"{stage}.npz")
+        index = CardIndex.load(path, df, self.keys[stage])
+        if index is None:
+            index = CardIndex.build(df, self.keys[stage])
+            index.save(path)
+        return index
+
+    def get_flagged_data(self):
+        return self.flagger.get_flagged_data() if self.flagger is not None else None
@@ -0,0 +1,229 @@
+import os
+import pickle
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+
+from feature_engineer import LAST_N_WINDOWS
+from geo_features import (IMPOSSIBLE_SPEED_KMH, MIN_GAP_SECONDS, RADIUS_BIN_KM, compute_geo_features,
+                          has_coordinates, haversine_km, radius_bins)
+
+
+class ProfileStore:
+    # Keeps running per-card state, so new batches of cleaned transactions can be added
+    # without rebuilding the customer profiles from the full history.
+
+    def __init__(self, window=5): # window is size of transactions for the recent spending trend
+        self.window = window
+        self.keep = max(window, *LAST_N_WINDOWS) # latest amounts kept per card, for every last N window
+        self.cards = {} # cc_num -> state of that card
+
+    def new_card_state(self):
+        return {
+            'total_spending': 0.0,
+            'total_trans_count': 0,
+            'max_transaction': -np.inf,
+            'active_days': set(), # day numbers
+            'recent': deque(maxlen=self.keep), # (timestamp, amount) of the last transactions
+            'categories': Counter(),
+            'hours': Counter(),
+            'radius_bins': Counter(), # km bin -> transactions
+            'max_travel_speed': np.nan,
+            'impossible_travel': 0,
+            'last_stop': None, # (timestamp, merch_lat, merch_long) of the latest transaction
+        }
+
+    def update(self, batch_df):
+        print(f"Updating profiles from {len(batch_df)} transactions")
+        if len(batch_df) == 0:
+            return self
+
+        # one vectorized pass over the batch, then one merge per card in the batch
+        batch = batch_df.sort_values(['cc_num', 'trans_date_trans_time'], kind='stable')
+        grouped = batch.groupby('cc_num', sort=False)
+        sums = grouped['amt'].sum()
+        counts = grouped['amt'].count()
+        maxes = grouped['amt'].max()
+
+        days = batch['trans_date_trans_time'].values.astype('datetime64[D]').astype(np.int64)
+        day_sets = pd.Series(days, index=batch.index).groupby(batch['cc_num'], sort=False).unique()
+
+        tails = grouped.tail(self.keep)
+        tail_times = tails['trans_date_trans_time'].values.astype('datetime64[ns]').astype(np.int64)
+        tail_rows = pd.DataFrame({'t': tail_times, 'amt': tails['amt'].values}).groupby(tails['cc_num'].values, sort=False)
+
+        cat_counts = batch.groupby(['cc_num', 'category'], observed=True, sort=False).size()
+        hour_counts = batch.groupby(['cc_num', 'trans_hour'], sort=False).size()
+
+        geo = has_coordinates(batch)
+        if geo:
+            dist = compute_geo_features(batch['cc_num'], batch['trans_date_trans_time'], batch['lat'], batch['long'],
+                                        batch['merch_lat'], batch['merch_long'])
+            cards = batch['cc_num'].to_numpy()
+            speed = pd.Series(dist['travel_speed_kmh'])
+            max_speeds = speed.groupby(cards, sort=False).max()
+            impossible = (speed > IMPOSSIBLE_SPEED_KMH).groupby(cards, sort=False).sum()
+            bins, known = radius_bins(dist['merch_dist_km'])
+            radius_counts = pd.Series(bins).groupby([cards[known], bins], sort=False).size()
+
+            # first and last stop of each card in the batch, to link the batch to the card's previous one
+            t = batch['trans_date_trans_time'].values.astype('datetime64[s]').astype(np.int64)
+            m_lat, m_long = batch['merch_lat'].to_numpy(), batch['merch_long'].to_numpy()
+            first = np.flatnonzero(np.r_[True, cards[1:] != cards[:-1]]) # batch is sorted by card
+            last = np.r_[first[1:] - 1, len(cards) - 1]
+            first_stops = {cards[i]: (int(t[i]), float(m_lat[i]), float(m_long[i])) for i in first}
+            last_stops = {cards[i]: (int(t[i]), float(m_lat[i]), float(m_long[i])) for i in last}
+
+        for card in sums.index:
+            state = self.cards.get(card)
+            if state is None:
+                state = self.cards[card] = self.new_card_state()
+
+            state['total_spending'] += sums[card]
+            state['total_trans_count'] += int(counts[card])
+            state['max_transaction'] = max(state['max_transaction'], maxes[card])
+            state['active_days'].update(day_sets[card].tolist())
+
+            rows = tail_rows.get_group(card)
+            self.add_recent(state, list(zip(rows['t'].tolist(), rows['amt'].tolist())))
+
+            if geo:
+                state['max_travel_speed'] = np.fmax(state['max_travel_speed'], max_speeds[card])
+                state['impossible_travel'] += int(impossible[card])
+                self.link_stops(state, first_stops[card], last_stops[card])
+
+        if geo:
+            for (card, km), n in radius_counts.items():
+                self.cards[card]['radius_bins'][int(km)] += int(n)
+
+        for (card, cat), n in cat_counts.items():
+            self.cards[card]['categories'][cat] += int(n)
+        for (card, hour), n in hour_counts.items():
+            self.cards[card]['hours'][int(hour)] += int(n)
+
+        print(f"Cards updated: {len(sums)}, cards stored: {len(self.cards)}")
+        return self
+
+    def add_recent(self, state, items):
+        recent = state['recent']
+        if recent and items and items[0][0] < recent[-1][0]: # out of order batch, merge by time
+            merged = sorted(list(recent) + items, key=lambda x: x[0]) # stable, older rows stay first on ties
+            recent.clear()
+            items = merged[-self.keep:]
+        recent.extend(items)
+
+    def link_stops(self, state, first, last):
+        # travel from the card's latest stop to the first stop of newer transactions, then move the latest stop
+        prev = state['last_stop']
+        if prev is not None and first[0] >= prev[0]:
+            hours = max(first[0] - prev[0], MIN_GAP_SECONDS) / 3600
+            speed = haversine_km(prev[1], prev[2], first[1], first[2]) / hours
+            state['max_travel_speed'] = np.fmax(state['max_travel_speed'], speed)
+            state['impossible_travel'] += int(speed > IMPOSSIBLE_SPEED_KMH)
+        if prev is None or last[0] >= prev[0]:
+            state['last_stop'] = last
+
+    def merge(self, other): # add the state of another store, e.g. built from a different file
+        if other.window != self.window:
+            raise ValueError(f"Cannot merge stores with windows {self.window} and {other.window}")
+
+        for card, o in other.cards.items():
+            state = self.cards.get(card)
+            if state is None:
+                state = self.cards[card] = self.new_card_state()
+
+            state['total_spending'] += o['total_spending']
+            state['total_trans_count'] += o['total_trans_count']
+            state['max_transaction'] = max(state['max_transaction'], o['max_transaction'])
+            state['active_days'] |= o['active_days']
+            self.add_recent(state, list(o['recent']))
+            state['categories'].update(o['categories'])
+            state['hours'].update(o['hours'])
+            state['radius_bins'].update(o['radius_bins'])
+            state['max_travel_speed'] = np.fmax(state['max_travel_speed'], o['max_travel_speed'])
+            state['impossible_travel'] += o['impossible_travel']
+            if o['last_stop'] is not None: # the move between the two stores' transactions is not counted
+                if state['last_stop'] is None or o['last_stop'][0] >= state['last_stop'][0]:
+                    state['last_stop'] = o['last_stop']
+        return self
+
+    def top_values(self, counter, total, k): # most frequent values, ties go to the smaller value
+        ranked = sorted(counter.items(), key=lambda x: (-x[1], x[0]))[:k]
+        values = [v for v, _ in ranked] + [np.nan] * (k - len(ranked))
+        share = ranked[0][1] / total if ranked else np.nan
+        return values, share
+
+    def last_n_stats(self, recent): # same as group_stats.last_n_per_group on the full history
+        stats = {}
+        for n in LAST_N_WINDOWS:
+            window = recent[-n:]
+            stats[f'last_{n}_mean'] = window.mean()
+            stats[f'last_{n}_max'] = window.max()
+            stats[f'last_{n}_std'] = window.std(ddof=1) if len(window) > 1 else np.nan
+        return stats
+
+    def radius_quantile(self, bins, q): # same as geo_features.radius_quantiles on the full history
+        if not bins:
+            return np.nan
+        km = sorted(bins)
+        cum = np.cumsum([bins[k] for k in km])
+        # first bin whose running count reaches q * n, i.e. the bin holding the row at rank ceil(q * n)
+        return (km[int(np.searchsorted(cum, q * cum[-1]))] + 0.5) * RADIUS_BIN_KM
+
+    def get_profiles(self): # same columns as FeatureEngineer.build_all_features
+        rows = []
+        for card in sorted(self.cards):
+            s = self.cards[card]
+            count = s['total_trans_count']
+            cats, cat_share = self.top_values(s['categories'], sum(s['categories'].values()), 3)
+            hours, hour_share = self.top_values(s['hours'], sum(s['hours'].values()), 1)
+            recent = np.array([amt for _, amt in s['recent']])
+
+            rows.append({
+                'cc_num': card,
+                'total_spending': s['total_spending'],
+                'avg_transaction': s['total_spending'] / count,
+                'max_transaction': s['max_transaction'],
+                'total_trans_count': count,
+                'days_active': len(s['active_days']),
+                'daily_velocity': count / len(s['active_days']),
+                'recent_spending_trend': recent[-self.window:].mean(),
+                **self.last_n_stats(recent),
+                'most_freq_category': cats[0],
+                'most_freq_category_share': cat_share,
+                'top_category_2': cats[1],
+                'top_category_3': cats[2],
+                'customer_peak_hour': hours[0],
+                'customer_peak_hour_share': hour_share,
+                'home_radius_km': self.radius_quantile(s['radius_bins'], 0.5),
+                'radius_p90_km': self.radius_quantile(s['radius_bins'], 0.9),
+                'max_travel_speed_kmh': s['max_travel_speed'],
+                'impossible_travel_count': s['impossible_travel'],
+            })
+
+        return pd.DataFrame(rows)
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({'window': self.window, 'cards': self.cards}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"Profile store saved to {path} ({len(self.cards)} cards)")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+
+        store = cls(window=data['window'])
+        store.cards = data['cards']
+        for state in store.cards.values(): # stores saved before a state field was added
+            for key, value in store.new_card_state().items():
+                state.setdefault(key, value)
+        print(f"Profile store loaded from {path} ({len(store.cards)} cards)")
+        return store
@@ -1,34 +1,44 @@
+from metrics_engine import MetricsEngine
+
+REPORT_SLICES = ['risk_band', 'category', 'state', 'hour', 'month']
+
+
 class ReportGenerator:
-    def __init__(self, flagged_df, final_profiles):
+    def __init__(self, flagged_df, final_profiles, metrics=None):
         self.df = flagged_df
         self.profiles = final_profiles
+        self.metrics = metrics # precomputed by TransactionFlagger.calculate_performance, else computed here
 
-    def export_report_to_txt(self):
-        
+    def export_report_to_txt(self, output_path="final_summary.txt"):
+        if self.metrics is None:
+            self.metrics = MetricsEngine(self.df).compute()
+        o = self.metrics.overall
 
-        total_rows = len(self.df)
-        total_fraud = self.df['is_fraud'].sum()
-        true_pos = ((self.df['is_flagged'] == 1) & (self.df['is_fraud'] == 1)).sum()
-        false_pos = ((self.df['is_flagged'] == 1) & (self.df['is_fraud'] == 0)).sum()
-        false_neg = ((self.df['is_flagged'] == 0) & (self.df['is_fraud'] == 1)).sum()
-        rec_val = (true_pos / total_fraud) * 100 if total_fraud > 0 else 0
-        money_saved = self.df[(self.df['is_flagged'] == 1) & (self.df['is_fraud'] == 1)]['amt'].sum()
-
-        with open("final_summary.txt", "w") as f:
+        with open(output_path, "w") as f:
             f.write("--- CUSTOMER RISK SCORING ---\n\n")
             f.write("Risk band distribution:\n")
             f.write(self.profiles['risk_band'].value_counts().to_string() + "\n")
             
             f.write("\n--- TRANSACTION FLAGGING PERFORMANCE ---\n")
-            f.write(f"Total rows:      {total_rows}\n")
-            f.write(f"Actual fraud (total fraud):    {total_fraud}\n")
-            f.write(f"Caught fraud (true positives):    {true_pos}\n")
-            f.write(f"Missed cases (false negatives):    {false_neg}\n")
-            f.write(f"False alarms (true positives):    {false_pos}\n")
-            f.write(f"Detection Rate(recall):  {rec_val:.2f}%\n")
-            f.write(f"Money saved:     ${money_saved:,.2f}\n")
+            if self.metrics.weighted:
+                f.write("Sampled data: counts and money are weighted estimates of the full data\n")
+            f.write(f"Total rows:      {o['rows']}\n")
+            f.write(f"Actual fraud (total fraud):    {o['fraud']}\n")
+            f.write(f"Caught fraud (true positives):    {o['tp']}\n")
+            f.write(f"Missed cases (false negatives):    {o['fn']}\n")
+            f.write(f"False alarms (false positives):    {o['fp']}\n")
+            f.write(f"Detection Rate(recall):  {o['recall']:.2f}%\n")
+            f.write(f"Precision:  {o['precision']:.2f}%\n")
+            f.write(f"Money saved:     ${o['money_saved']:,.2f}\n")
             
             f.write("\n--- TOP FLAGGED CATEGORIES ---\n")
-            f_rows = self.df[self.df['is_flagged'] == 1]
-            f.write(f_rows['category'].value_counts().head(5).to_string() + "\n")
+            f.write(self.metrics.top('category', 5).to_string() + "\n")
+
+            # breakdowns from the same aggregates
+            for name in REPORT_SLICES:
+                if name not in self.metrics.slices:
+                    continue
+                table = self.metrics.slices[name][['rows', 'fraud', 'flagged', 'tp', 'fp', 'fn', 'recall', 'precision', 'money_saved']]
+                f.write(f"\n--- PERFORMANCE BY {name.upper().replace('_', ' ')} ---\n")
+                f.write(table.to_string(float_format=lambda x: f"{x:,.2f}") + "\n")
             print("\n--- FINAL REPORT EXPORTED ---")
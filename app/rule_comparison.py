@@ -0,0 +1,145 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics_engine import MetricsEngine, weighted_counts
+from risk_scorer_customer import RiskScorer
+from rule_engine import RuleEngine
+from transaction_flagger import compute_rule_columns
+
+
+def load_challengers(paths): # rule file -> RuleEngine, named after the file
+    challengers = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name == 'champion' or name in challengers:
+            raise ValueError(f"Challenger name '{name}' is used twice, rename {path}")
+        challengers[name] = RuleEngine(path=path)
+    return challengers
+
+
+def band_order(engines): # band names of every config, lowest min_score first
+    lowest = {}
+    for engine in engines:
+        lowest.setdefault(engine.default_band, -np.inf)
+        for band in engine.bands:
+            lowest[band['name']] = min(lowest.get(band['name'], np.inf), band['min_score'])
+    return sorted(lowest, key=lowest.get)
+
+
+class RuleComparison:
+    # Champion / challenger run: the current rules and any number of candidate rule sets score the
+    # same customer profiles and flag the same transactions. The rule independent work is done once
+    # (score inputs such as vel_z, the window / distance / profile columns the flag rules read,
+    # the profile row of every transaction), so each config only adds its own rule checks
+    # and the run time grows linearly with the number of configs.
+
+    def __init__(self, df, customer_profiles, champion=None, challengers=None):
+        self.df = df
+        self.configs = {'champion': champion if champion is not None else RuleEngine()}
+        self.configs.update(challengers or {})
+        self.profiles = RiskScorer(customer_profiles, self.configs['champion']).add_score_inputs()
+
+        self.bands = {} # config -> risk band per profile
+        self.flags = {} # config -> is_flagged per transaction
+        self.results = None # one row per config: bands, performance, changes against the champion
+        self.migrations = {} # challenger -> champion band x challenger band card counts
+
+    def shared_columns(self):
+        # every column the flag rules of all configs read, except the per config score columns
+        needed = set().union(*(rules.flag_plan.columns() for rules in self.configs.values()))
+        columns = {c: self.df[c] for c in needed if c in self.df.columns}
+        columns['cust_avg'] = self.df['cc_num'].map(self.profiles.set_index('cc_num')['avg_transaction'])
+        columns.update(compute_rule_columns(self.df, self.profiles, sorted(needed - set(columns))))
+        return columns
+
+    def score(self, rules): # per profile columns of one config
+        points = rules.score_points(self.profiles)
+        total = np.sum(list(points.values()), axis=0) if points else np.zeros(len(self.profiles))
+        return dict(points, total_risk_score=total, risk_band=rules.assign_bands(total))
+
+    def run(self):
+        print("\n--- RULE COMPARISON STARTED ---\n")
+        start = time.perf_counter()
+        shared = self.shared_columns()
+        card_row = pd.Index(self.profiles['cc_num']).get_indexer(self.df['cc_num']) # profile of each row, -1 if none
+        order = band_order(self.configs.values())
+        print(f"Shared columns for {len(self.configs)} configs in {time.perf_counter() - start:.2f}s")
+
+        for name, rules in self.configs.items():
+            config_start = time.perf_counter()
+            scores = self.score(rules)
+            codes = pd.Categorical(scores['risk_band'], categories=order).codes
+
+            data = dict(shared)
+            data['risk_level'] = pd.Series(pd.Categorical.from_codes(np.where(card_row >= 0, codes[card_row], -1), categories=order))
+            for col in rules.flag_plan.columns() & set(scores): # flag rules on score columns, e.g. total_risk_score
+                values = np.asarray(scores[col], dtype=float)
+                data[col] = np.where(card_row >= 0, values[card_row], np.nan)
+
+            self.bands[name] = scores['risk_band']
+            self.flags[name] = rules.flag(data)
+            print(f"{name}: {int(self.flags[name].sum())} flagged in {time.perf_counter() - config_start:.2f}s")
+
+        self.results = pd.DataFrame([self.summarize(name, order) for name in self.configs]).set_index('config')
+        self.migrations = {name: self.migration(name, order) for name in self.configs if name != 'champion'}
+        print(f"\nCompared {len(self.configs)} configs in {time.perf_counter() - start:.2f}s")
+        self.print_summary()
+        print("\n--- RULE COMPARISON FINISHED ---\n")
+        return self.results
+
+    def summarize(self, name, order):
+        row = {'config': name}
+        row.update(pd.Series(self.bands[name]).value_counts().reindex(order, fill_value=0).to_dict())
+
+        # same numbers as TransactionFlagger.calculate_performance, sample weights included
+        frame = pd.DataFrame({'is_flagged': self.flags[name], 'is_fraud': self.df['is_fraud'].to_numpy(), 'amt': self.df['amt'].to_numpy()})
+        if 'sample_weight' in self.df.columns:
+            frame['sample_weight'] = self.df['sample_weight'].to_numpy()
+        o = MetricsEngine(frame, slices=[]).compute().overall
+        row.update({k: o[k] for k in ['flagged', 'tp', 'fp', 'fn', 'recall', 'precision', 'money_saved']})
+
+        # changes against the champion
+        row['cards_moved'] = int((self.bands[name] != self.bands['champion']).sum())
+        row.update(self.flag_changes(name))
+        return row
+
+    def flag_changes(self, name): # rows flagged by only one side, and the fraud among them
+        fraud = self.df['is_fraud'].to_numpy() == 1
+        weights = self.df['sample_weight'].to_numpy(dtype=float) if 'sample_weight' in self.df.columns else None
+        change = self.flags['champion'].astype(np.int64) * 2 + self.flags[name] # 1 added, 2 removed
+        rows = weighted_counts(change, weights, 4)
+        frauds = weighted_counts(change[fraud], weights[fraud] if weights is not None else None, 4)
+        return {'flags_added': int(rows[1]), 'flags_removed': int(rows[2]),
+                'fraud_gained': int(frauds[1]), 'fraud_lost': int(frauds[2])}
+
+    def migration(self, name, order): # cards per (champion band, challenger band)
+        champion = pd.Categorical(self.bands['champion'], categories=order).codes
+        challenger = pd.Categorical(self.bands[name], categories=order).codes
+        counts = np.bincount(champion * len(order) + challenger, minlength=len(order) ** 2)
+        matrix = pd.DataFrame(counts.reshape(len(order), -1), index=order, columns=order)
+        matrix.index.name, matrix.columns.name = 'champion', name
+        return matrix
+
+    def changed_rows(self, name): # transactions whose flag differs from the champion, for review
+        changed = self.flags['champion'] != self.flags[name]
+        rows = self.df[changed].copy()
+        rows['champion_flag'] = self.flags['champion'][changed].astype('int8')
+        rows[f'{name}_flag'] = self.flags[name][changed].astype('int8')
+        return rows
+
+    def print_summary(self):
+        print("\nConfigs side by side:")
+        print(self.results.round(2).astype(object).T.to_string()) # object keeps the counts as integers
+        for name, matrix in self.migrations.items():
+            print(f"\nBand migration, champion (rows) -> {name} (columns):")
+            print(matrix.to_string())
+
+    def export(self, output_dir="outputs"):
+        os.makedirs(output_dir, exist_ok=True)
+        self.results.to_csv(os.path.join(output_dir, "rule_comparison.csv"))
+        for name, matrix in self.migrations.items():
+            matrix.to_csv(os.path.join(output_dir, f"band_migration_{name}.csv"))
+        print(f"Rule comparison saved to {output_dir}")
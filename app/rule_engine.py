@@ -0,0 +1,147 @@
+import json
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "rules.json")
+
+COMPARE_OPS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+SET_OPS = ['in', 'not_in']
+
+
+def load_rules(path=None):
+    with open(path or DEFAULT_RULES_PATH) as f:
+        return json.load(f)
+
+
+class RulePlan:
+    # A list of rules compiled into one evaluation plan. Every distinct expression
+    # (e.g. amt >= 200, the night hour check) becomes a single node, so it is computed
+    # once per run no matter how many rules use it.
+
+    def __init__(self, rules, lists=None):
+        self.lists = lists or {}
+        self.nodes = [] # (kind, payload), children always come before their parents
+        self.node_ids = {} # expression -> node index
+        self.rules = [] # (name, node index, points)
+
+        for rule in rules:
+            if rule.get('enabled', True):
+                self.rules.append((rule['name'], self.add_node(rule['when']), rule.get('points', 0)))
+
+    def add_node(self, expr):
+        key = json.dumps(expr, sort_keys=True)
+        if key in self.node_ids:
+            return self.node_ids[key]
+
+        if 'all' in expr or 'any' in expr:
+            kind = 'all' if 'all' in expr else 'any'
+            node = (kind, [self.add_node(e) for e in expr[kind]])
+        else:
+            node = ('leaf', self.resolve_leaf(expr))
+
+        self.nodes.append(node)
+        self.node_ids[key] = len(self.nodes) - 1
+        return self.node_ids[key]
+
+    def resolve_leaf(self, expr):
+        op = expr['op']
+        if op not in COMPARE_OPS and op not in SET_OPS:
+            raise ValueError(f"Unknown operator '{op}' in rule expression {expr}")
+
+        leaf = dict(expr)
+        value = leaf.get('value')
+        if isinstance(value, str) and value.startswith('@'): # named list from the config
+            leaf['value'] = self.lists[value[1:]]
+        return leaf
+
+    def eval_leaf(self, data, leaf): # data is a DataFrame or a dict of arrays
+        col = data[leaf['col']]
+        op, value = leaf['op'], leaf.get('value')
+
+        if isinstance(getattr(col, 'dtype', None), pd.CategoricalDtype) and op in SET_OPS + ['==', '!='] and 'ref' not in leaf:
+            # equality and membership: compare the few categories once, then look up every row by its code
+            # (ordering ops like > fall through to the row wise comparison below)
+            values = value if op in SET_OPS else [value]
+            hit = np.append(col.cat.categories.isin(values), False) # code -1 (missing) maps to False
+            mask = hit[col.cat.codes.to_numpy()]
+            return ~mask if op in ('not_in', '!=') else mask
+
+        arr = np.asarray(col)
+        if op in SET_OPS:
+            mask = np.isin(arr, list(value))
+            return ~mask if op == 'not_in' else mask
+
+        if 'ref' in leaf: # compare against another column, e.g. amt > cust_avg * 3
+            value = np.asarray(data[leaf['ref']]) * leaf.get('scale', 1)
+        return np.asarray(COMPARE_OPS[op](arr, value), dtype=bool)
+
+    def evaluate(self, data): # rule name -> boolean mask
+        values = []
+        for kind, payload in self.nodes:
+            if kind == 'leaf':
+                values.append(self.eval_leaf(data, payload))
+            elif kind == 'all':
+                values.append(np.logical_and.reduce([values[i] for i in payload]))
+            else:
+                values.append(np.logical_or.reduce([values[i] for i in payload]))
+
+        return {name: values[node] for name, node, _ in self.rules}
+
+    def columns(self): # every column the enabled rules read
+        cols = set()
+        for kind, payload in self.nodes:
+            if kind == 'leaf':
+                cols.add(payload['col'])
+                if 'ref' in payload:
+                    cols.add(payload['ref'])
+        return cols
+
+    def describe(self):
+        leaves = sum(1 for kind, _ in self.nodes if kind == 'leaf')
+        return f"{len(self.rules)} rules, {len(self.nodes)} unique expressions ({leaves} column checks)"
+
+
+class RuleEngine:
+    # Customer scoring and transaction flagging rules, read from config/rules.json
+
+    def __init__(self, config=None, path=None):
+        self.path = path or DEFAULT_RULES_PATH
+        self.config = config if config is not None else load_rules(self.path)
+        lists = self.config.get('lists', {})
+
+        scoring = self.config['customer_scoring']
+        self.scoring_plan = RulePlan(scoring['rules'], lists)
+        self.default_band = scoring.get('default_band', 'Low')
+        self.bands = sorted(scoring['bands'], key=lambda b: b['min_score'])
+
+        self.flag_plan = RulePlan(self.config['transaction_flagging']['rules'], lists)
+
+    def score_points(self, profiles): # rule name -> points per customer
+        masks = self.scoring_plan.evaluate(profiles)
+        return {name: np.where(masks[name], points, 0) for name, _, points in self.scoring_plan.rules}
+
+    def assign_bands(self, scores):
+        scores = np.asarray(scores)
+        bands = np.full(len(scores), self.default_band, dtype=object)
+        for band in self.bands: # higher bands overwrite lower ones
+            bands[scores >= band['min_score']] = band['name']
+        return bands
+
+    def flag_masks(self, data): # rule name -> flagged by that rule
+        return self.flag_plan.evaluate(data)
+
+    def flag(self, data): # flagged if any rule matches
+        masks = self.flag_masks(data)
+        if not masks:
+            return np.zeros(len(data['amt']), dtype=bool)
+        return np.logical_or.reduce(list(masks.values()))
@@ -0,0 +1,184 @@
+import argparse
+import os
+import sys
+import time
+import traceback
+
+from data_visualizer import DataVisualizer
+from exporter import Exporter
+from pipeline import FraudPipeline
+from report_generator import ReportGenerator
+from rule_engine import RuleEngine
+from sampler import Sampler
+from seen_keys import SeenKeys
+from stage_cache import StageCache
+from stage_profiler import StageProfiler
+
+STAGES = ['load', 'clean', 'features', 'score', 'flag', 'report']
+
+# exit codes, for schedulers
+EXIT_OK = 0
+EXIT_STAGE_FAILED = 1
+EXIT_USAGE = 2 # also what argparse uses for bad arguments
+EXIT_INPUT_MISSING = 3
+EXIT_LOAD_FAILED = 4
+
+
+def parse_stages(value):
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s) {', '.join(unknown)}, choose from {', '.join(STAGES)}")
+    return stages
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the fraud pipeline without the interactive menu")
+    parser.add_argument("paths", nargs="*", default=["Data/fraudTrain.csv", "Data/fraudTest.csv"],
+                        help="one or two input CSV files (default: the two Data/ files)")
+    parser.add_argument("--stages", type=parse_stages, default=STAGES,
+                        help=f"comma separated stages to run, the stages they depend on run too (default: {','.join(STAGES)})")
+    parser.add_argument("--output-dir", default="outputs", help="where the CSVs and the report are written")
+    parser.add_argument("--rolling-window", type=int, default=7)
+    parser.add_argument("--rules", default=None, help="rule config (default: config/rules.json)")
+    parser.add_argument("--workers", type=int, default=1, help="processes for feature engineering")
+    parser.add_argument("--cache-dir", default="cache/stages")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage and do not store results")
+    parser.add_argument("--full-row-dedup", action="store_true", help="find duplicates by comparing whole rows instead of trans_num")
+    parser.add_argument("--seen-keys", default=None,
+                        help="keys of earlier runs (e.g. cache/seen_keys.npz), rows seen there are dropped and, once flagging ran, this run's keys are added")
+    parser.add_argument("--sample", choices=["fraud", "cards"], default=None,
+                        help="run on a sample: every fraud row and part of the legit rows, or part of the cards")
+    parser.add_argument("--sample-fraction", type=float, default=0.1, help="share of legit rows / cards kept by --sample")
+    parser.add_argument("--seed", type=int, default=42, help="seed of --sample")
+    parser.add_argument("--compare-rules", action="append", default=None, metavar="RULES",
+                        help="compare the rules with this candidate rule file after feature engineering (repeatable)")
+    parser.add_argument("--no-export", action="store_true", help="do not write the flagged transactions")
+    parser.add_argument("--export-config", default=None, help="export settings (default: config/export.json)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None, help="format of the flagged transactions")
+    parser.add_argument("--partition-by", choices=["month", "risk_band", "none"], default=None)
+    parser.add_argument("--flagged-only", action="store_true", default=None, help="export only the flagged rows")
+    parser.add_argument("--columns", default=None, help="comma separated columns to export")
+    parser.add_argument("--charts", action="store_true", help="render the chart pack into <output-dir>/images after cleaning")
+    parser.add_argument("--trace", default=None, help="write a JSON trace of every stage to this path")
+    parser.add_argument("--cprofile-dir", default=None, help="with --trace, also dump a cProfile file per stage")
+    parser.add_argument("--trace-allocations", action="store_true", help="with --trace, record allocation peaks per stage (slower)")
+    return parser.parse_args(argv)
+
+
+def required_stages(stages): # a stage needs every stage before it, up to the last one asked for
+    return STAGES[:max(STAGES.index(s) for s in stages) + 1]
+
+
+class BatchRunner:
+    # Runs the FraudPipeline stages end to end for scheduled jobs: no prompts,
+    # no sample prints, outputs in one directory and a timing line per stage.
+
+    def __init__(self, args):
+        self.args = args
+        rules = RuleEngine(path=args.rules) if args.rules else None
+        dedup_key = None if args.full_row_dedup else 'trans_num'
+        seen_keys = SeenKeys(args.seen_keys, dedup_key) if args.seen_keys else None
+        sampler = Sampler(args.sample, args.sample_fraction, args.seed) if args.sample else None
+        self.pipeline = FraudPipeline(StageCache(args.cache_dir), rules, use_cache=not args.no_cache, n_workers=args.workers,
+                                      dedup_key=dedup_key, seen_keys=seen_keys, sampler=sampler)
+        self.exporter = Exporter(path=args.export_config, output_dir=args.output_dir)
+        self.timings = {}
+
+    def output(self, name):
+        return os.path.join(self.args.output_dir, name)
+
+    def run_stage(self, stage):
+        p = self.pipeline
+        if stage == 'load':
+            if not p.load(*self.args.paths):
+                return EXIT_LOAD_FAILED
+        elif stage == 'clean':
+            p.clean()
+            if self.args.charts:
+                viz = DataVisualizer(p.clean_data, copy=False)
+                viz.save_dir = self.output("images")
+                viz.render_all(self.args.workers)
+        elif stage == 'features':
+            p.build_features(self.args.rolling_window, show_sample=False)
+        elif stage == 'score':
+            p.score(output_path=None, show_sample=False)
+            self.exporter.export(p.scored_profiles, "customer_risk_summary") # also written on a cache hit
+        elif stage == 'flag':
+            p.flag(output_path=None)
+            p.calculate_performance()
+            if not self.args.no_export:
+                columns = self.args.columns.split(",") if self.args.columns else None
+                self.exporter.export(p.get_flagged_data(), "flagged_transactions", self.args.format,
+                                     partition_by=self.args.partition_by, flagged_only=self.args.flagged_only, columns=columns)
+        elif stage == 'report':
+            report = ReportGenerator(p.get_flagged_data(), p.scored_profiles, p.get_metrics())
+            report.export_report_to_txt(self.output("final_summary.txt"))
+        return EXIT_OK
+
+    def run(self):
+        missing = [path for path in self.args.paths if not os.path.exists(path)]
+        if missing:
+            print(f"Input file not found: {', '.join(missing)}", file=sys.stderr)
+            return EXIT_INPUT_MISSING
+        if not 1 <= len(self.args.paths) <= 2:
+            print("Give one or two input files", file=sys.stderr)
+            return EXIT_USAGE
+
+        os.makedirs(self.args.output_dir, exist_ok=True)
+        stages = required_stages(self.args.stages + (['features'] if self.args.compare_rules else []))
+        start = time.perf_counter()
+
+        for stage in stages:
+            stage_start = time.perf_counter()
+            try:
+                code = self.run_stage(stage)
+            except Exception:
+                traceback.print_exc()
+                code = EXIT_STAGE_FAILED
+            self.timings[stage] = time.perf_counter() - stage_start
+
+            if code != EXIT_OK:
+                print(f"Stage '{stage}' failed, stopping (exit code {code})", file=sys.stderr)
+                return code
+            if stage == 'clean' and len(self.pipeline.clean_data) == 0: # e.g. every row was in --seen-keys
+                print("No transactions left after cleaning, skipping the later stages")
+                break
+        else:
+            # the loaded transactions count as seen only once they were flagged, a partial or failed
+            # run leaves the seen keys as they were so a rerun gets the same rows
+            if 'flag' in stages:
+                self.pipeline.record_seen_keys()
+
+        if self.args.compare_rules and self.pipeline.customer_profiles is not None:
+            compare_start = time.perf_counter()
+            try:
+                self.pipeline.compare_rules(self.args.compare_rules).export(self.args.output_dir)
+            except Exception:
+                traceback.print_exc()
+                print("Rule comparison failed", file=sys.stderr)
+                return EXIT_STAGE_FAILED
+            self.timings['compare'] = time.perf_counter() - compare_start
+
+        print("\nStage timings:")
+        for stage, seconds in self.timings.items():
+            print(f"  {stage:<10}{seconds:8.2f}s")
+        print(f"  {'total':<10}{time.perf_counter() - start:8.2f}s")
+        return EXIT_OK
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runner = BatchRunner(args)
+    if not args.trace:
+        return runner.run()
+
+    profiler = StageProfiler(args.trace, args.cprofile_dir, args.trace_allocations)
+    with profiler:
+        code = runner.run()
+    profiler.print_summary()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+STRATEGIES = ['fraud', 'cards']
+HASH_BUCKETS = 1_000_000
+
+
+def card_hash_fraction(cc_num, seed): # a number in [0, 1) per card, the same in every file and run
+    seeds = np.full(len(cc_num), seed, dtype=np.int64)
+    hashes = pd.util.hash_array(np.asarray(cc_num, dtype=np.int64) ^ seeds)
+    return (hashes % HASH_BUCKETS) / HASH_BUCKETS
+
+
+class Sampler:
+    # Smaller data for exploratory runs, applied right after loading so every later stage takes it as is.
+    #   'fraud': all fraud rows and `fraction` of the legit rows. Every row gets a sample_weight
+    #            (1 for fraud, legit rows / kept legit rows for legit) so metrics and charts can be
+    #            scaled back to the full data. Per card features are skewed, cards lose legit rows.
+    #   'cards': every transaction of about `fraction` of the cards, so per card features stay valid.
+    #            Cards are picked by a seeded hash of cc_num, so a card kept in one file is kept in all.
+
+    def __init__(self, strategy='fraud', fraction=0.1, seed=42):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy '{strategy}', use {' or '.join(STRATEGIES)}")
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Sample fraction must be in (0, 1], got {fraction}")
+        self.strategy = strategy
+        self.fraction = fraction
+        self.seed = seed
+
+    def params(self): # for cache keys
+        return {'strategy': self.strategy, 'fraction': self.fraction, 'seed': self.seed}
+
+    def apply(self, df):
+        print(f"Sampling ({self.strategy}, fraction {self.fraction}, seed {self.seed})")
+        if self.strategy == 'fraud':
+            keep, weight = self.fraud_rows(df)
+        else:
+            keep, weight = self.card_rows(df)
+
+        sample = df[keep].reset_index(drop=True)
+        sample['sample_weight'] = weight[keep].astype(np.float32)
+        if 'source_files' in df.attrs: # rows per loaded file, for the duplicate report
+            sizes = [rows for _, rows in df.attrs['source_files']]
+            if sum(sizes) == len(df):
+                kept = np.add.reduceat(keep, np.r_[0, np.cumsum(sizes)[:-1]]) if len(df) else sizes
+                sample.attrs['source_files'] = [[name, int(n)] for (name, _), n in zip(df.attrs['source_files'], kept)]
+
+        print(f"Sample: {len(sample)} of {len(df)} rows ({len(sample) / max(len(df), 1):.1%}), "
+              f"{int((sample['is_fraud'] == 1).sum())} fraud")
+        return sample
+
+    def fraud_rows(self, df):
+        fraud = df['is_fraud'].to_numpy() == 1
+        legit = np.flatnonzero(~fraud)
+        n_keep = int(round(len(legit) * self.fraction))
+        rng = np.random.default_rng(self.seed)
+
+        keep = fraud.copy()
+        keep[rng.choice(legit, n_keep, replace=False)] = True
+        weight = np.where(fraud, 1.0, len(legit) / n_keep if n_keep else 0.0)
+        return keep, weight
+
+    def card_rows(self, df):
+        cc = df['cc_num'].to_numpy()
+        cards = np.unique(cc)
+        kept_cards = cards[card_hash_fraction(cards, self.seed) < self.fraction]
+        keep = np.isin(cc, kept_cards)
+        # every kept card stands for len(cards) / len(kept_cards) cards
+        weight = np.full(len(df), len(cards) / len(kept_cards) if len(kept_cards) else 0.0)
+        return keep, weight
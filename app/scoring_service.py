@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from rule_engine import RuleEngine
+from geo_features import COORD_COLUMNS, GEO_COLUMNS, haversine_km
+from window_features import WINDOW_COLUMNS
+
+
+def request_size(request): # transactions in a queued request, anything that is not a list counts as one
+    return len(request) if isinstance(request, list) else 1
+
+
+class TransactionScorer:
+    # Scores single transactions or micro-batches against preloaded scored profiles,
+    # with the same flag rules as TransactionFlagger
+
+    def __init__(self, scored_profiles, rules=None):
+        profiles = scored_profiles.sort_values('cc_num')
+        self.cards = profiles['cc_num'].to_numpy(dtype=np.int64)
+        self.risk = profiles['risk_band'].astype(str).to_numpy(dtype=object)
+        self.avg = profiles['avg_transaction'].to_numpy(dtype=np.float64)
+        self.rules = rules if rules is not None else RuleEngine()
+        used = self.rules.flag_plan.columns()
+        # history based values come with the request, profile fields the rules read (e.g. radius_p90_km) from the index
+        self.request_columns = [c for c in WINDOW_COLUMNS + GEO_COLUMNS if c in used]
+        self.profile_columns = {c: profiles[c].to_numpy(dtype=np.float64) for c in used
+                                if c in profiles.columns and c not in ('cc_num', 'risk_band', 'avg_transaction')}
+
+    def get_hour(self, txn):
+        if 'trans_hour' in txn:
+            return int(txn['trans_hour'])
+        t = txn['trans_date_trans_time']
+        if isinstance(t, str):
+            return int(t[11:13]) # 'YYYY-MM-DD HH:MM:SS'
+        return t.hour
+
+    def lookup(self, values, pos, known, missing): # profile values of the batch cards, `missing` for unknown cards
+        if len(values) == 0:
+            return np.full(len(pos), missing, dtype=values.dtype)
+        return np.where(known, values[pos], missing)
+
+    def score(self, txn): # one transaction given as a dict
+        return self.score_batch([txn])[0]
+
+    def score_batch(self, txns): # list of dicts, vectorized over the batch
+        if len(txns) == 0:
+            return []
+
+        n = len(txns)
+        cc = np.fromiter((int(t['cc_num']) for t in txns), dtype=np.int64, count=n)
+        data = {
+            'cc_num': cc,
+            'amt': np.fromiter((float(t['amt']) for t in txns), dtype=np.float64, count=n),
+            'trans_hour': np.fromiter((self.get_hour(t) for t in txns), dtype=np.int64, count=n),
+            'category': np.array([t['category'] for t in txns], dtype=object),
+        }
+
+        # in-memory index on cc_num, unknown cards get no risk and no average, like the batch map
+        pos = np.searchsorted(self.cards, cc).clip(0, max(len(self.cards) - 1, 0))
+        known = self.cards[pos] == cc if len(self.cards) else np.zeros(n, dtype=bool) # no profiles: all unknown
+        data['cust_avg'] = self.lookup(self.avg, pos, known, np.nan)
+        data['risk_level'] = self.lookup(self.risk, pos, known, None)
+
+        for col, values in self.profile_columns.items():
+            data[col] = self.lookup(values, pos, known, np.nan)
+
+        # window and travel features need the card's history, the caller sends them with the transaction (missing = no match)
+        for col in self.request_columns:
+            data[col] = np.fromiter((float(t.get(col, np.nan)) for t in txns), dtype=np.float64, count=n)
+        if 'merch_dist_km' in self.request_columns: # computed here when the coordinates are sent instead
+            coords = [np.fromiter((float(t.get(c, np.nan)) for t in txns), dtype=np.float64, count=n) for c in COORD_COLUMNS]
+            data['merch_dist_km'] = np.where(np.isnan(data['merch_dist_km']), haversine_km(*coords), data['merch_dist_km'])
+
+        masks = self.rules.flag_masks(data)
+        results = []
+        for i in range(n):
+            reasons = [name for name, mask in masks.items() if mask[i]]
+            results.append({
+                'cc_num': int(cc[i]),
+                'is_flagged': 1 if reasons else 0,
+                'risk_level': data['risk_level'][i],
+                'reasons': reasons,
+            })
+        return results
+
+
+class LatencyStats:
+    # Latency percentiles over the most recent requests, plus throughput since start
+
+    def __init__(self, keep=100_000):
+        self.latencies = deque(maxlen=keep)
+        self.transactions = 0
+        self.requests = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def record(self, seconds, n_txns=1):
+        self.latencies.append(seconds)
+        self.requests += 1
+        self.transactions += n_txns
+
+    def summary(self):
+        lat = np.array(self.latencies) * 1000
+        elapsed = time.perf_counter() - self.started
+        return {
+            'requests': self.requests,
+            'transactions': self.transactions,
+            'batches': self.batches,
+            'p50_ms': float(np.percentile(lat, 50)) if len(lat) else None,
+            'p99_ms': float(np.percentile(lat, 99)) if len(lat) else None,
+            'throughput_per_sec': self.transactions / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class ScoringServer:
+    # Local asyncio HTTP/JSON endpoint. Requests are queued and scored together in micro-batches.
+    #   POST /score    body: one transaction object or a list of them
+    #   GET  /metrics  latency and throughput counters
+
+    def __init__(self, scorer, host="127.0.0.1", port=8080, max_batch=256, max_wait_ms=1.0):
+        self.scorer = scorer
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = LatencyStats()
+        self.queue = None
+        self.server = None
+        self.batch_task = None
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.batch_task = asyncio.create_task(self.batch_loop())
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1] # real port when 0 was given
+        print(f"Scoring service listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batch_task.cancel()
+
+    async def submit(self, txns): # Python API, goes through the same batching as HTTP
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((txns, future))
+        result = await future
+        self.stats.record(time.perf_counter() - start, len(txns))
+        return result
+
+    async def batch_loop(self):
+        while True:
+            items = [await self.queue.get()]
+            try:
+                await self.run_batch(items)
+            except Exception as e: # never let one bad request stop the batch task
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def run_batch(self, items):
+        loop = asyncio.get_running_loop()
+        size = request_size(items[0][0])
+        deadline = loop.time() + self.max_wait
+
+        # collect more requests until the batch is full or the wait is over
+        while size < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += request_size(item[0])
+
+        try:
+            results = self.scorer.score_batch([t for request, _ in items for t in request])
+        except Exception: # a bad request in the batch, score requests one by one so only it fails
+            for request, future in items:
+                try:
+                    result = self.scorer.score_batch(request)
+                except Exception as e:
+                    result, error = None, e
+                else:
+                    error = None
+                if future.done(): # the client may be gone
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+            return
+
+        self.stats.batches += 1
+        i = 0
+        for request, future in items:
+            if not future.done(): # the client may be gone
+                future.set_result(results[i:i + len(request)])
+            i += len(request)
+
+    async def read_request(self, reader): # None at the end of the stream, ValueError on a malformed request
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode().split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, value = line.decode().split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length < 0:
+            raise ValueError(f"negative Content-Length {length}")
+        body = await reader.readexactly(length)
+        return method, path, headers, body
+
+    async def respond(self, writer, status, payload):
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True: # keep-alive, several requests per connection
+                try:
+                    request = await self.read_request(reader)
+                except ValueError as e: # bad request line, header or Content-Length, the stream can't be trusted after it
+                    await self.respond(writer, "400 Bad Request", {'error': f"malformed request: {e}"})
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+
+                status, payload = await self.route(method, path, body)
+                await self.respond(writer, status, payload)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == "POST" and path == "/score":
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                return "400 Bad Request", {'error': 'body is not valid JSON'}
+
+            single = isinstance(payload, dict)
+            txns = [payload] if single else payload
+            if not isinstance(txns, list) or not all(isinstance(t, dict) for t in txns):
+                return "400 Bad Request", {'error': 'body must be a transaction object or a list of them'}
+            try:
+                results = await self.submit(txns)
+            except Exception as e: # any scoring error is about the request (missing field, bad time, ...)
+                return "400 Bad Request", {'error': f"bad transaction: {e}"}
+            return "200 OK", results[0] if single else results
+
+        if method == "GET" and path == "/metrics":
+            return "200 OK", self.stats.summary()
+
+        return "404 Not Found", {'error': f"no route {method} {path}"}
+
+
+async def serve(scorer, host, port, max_batch, max_wait_ms):
+    server = ScoringServer(scorer, host, port, max_batch, max_wait_ms)
+    await server.start()
+    async with server.server:
+        await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score single transactions against scored customer profiles")
+    parser.add_argument("--rules", default=None, help="rules config, defaults to config/rules.json")
+    parser.add_argument("--profiles", default="outputs/customer_risk_summary.csv", help="output of the risk scoring step")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    scorer = TransactionScorer(pd.read_csv(args.profiles), RuleEngine(path=args.rules))
+    try:
+        asyncio.run(serve(scorer, args.host, args.port, args.max_batch, args.max_wait_ms))
+    except KeyboardInterrupt:
+        print("\nScoring service stopped")
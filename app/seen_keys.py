@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def hash_keys(values): # one uint64 per key value
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def hash_rows(df): # one uint64 per row over every column, for full row comparison
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def source_file_ids(df):
+    # which loaded file each row came from, DataManager records the rows per file in df.attrs
+    sizes = [rows for _, rows in df.attrs.get('source_files', [])]
+    if sum(sizes) != len(df): # one file, or data that did not come from DataManager
+        return np.zeros(len(df), dtype=np.int64)
+    return np.repeat(np.arange(len(sizes)), sizes)
+
+
+def find_duplicates(keys, file_ids):
+    # Repeats of an earlier row, split by whether the first occurrence is in the same file or in an earlier one
+    codes, _ = pd.factorize(keys, use_na_sentinel=False) # codes are numbered in order of first appearance
+    is_first = codes > np.r_[-1, np.maximum.accumulate(codes)[:-1]]
+    first_row = np.flatnonzero(is_first)[codes]
+
+    dup = ~is_first
+    within = dup & (file_ids[first_row] == file_ids)
+    return within, dup & ~within
+
+
+class SeenKeys:
+    # Hashed keys (trans_num, or whole rows) of every transaction loaded before, kept as one sorted
+    # uint64 array: 8 bytes per transaction on disk and in memory, a membership check is a binary search.
+    # Lets newly appended files be de-duplicated against the history without reading the history again.
+    # Two different keys share a hash with a chance of about n^2 / 2^65.
+
+    def __init__(self, path="cache/seen_keys.npz", key='trans_num'):
+        self.path = path
+        self.key = key # None means full rows
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+        if os.path.exists(path):
+            with np.load(path) as data:
+                stored_key = str(data['key']) or None
+                if stored_key != key:
+                    raise ValueError(f"{path} holds keys of '{stored_key or 'full rows'}', not '{key or 'full rows'}'")
+                self.hashes = data['hashes']
+            print(f"Seen keys loaded from {path} ({len(self.hashes)} transactions)")
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def contains(self, hashes):
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self.hashes, hashes).clip(0, len(self.hashes) - 1)
+        return self.hashes[pos] == hashes
+
+    def add(self, hashes):
+        self.hashes = np.union1d(self.hashes, np.asarray(hashes, dtype=np.uint64)) # sorted, unique
+        return self
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, hashes=self.hashes, key=np.array(self.key or ''))
+        os.replace(tmp_path, self.path)
+        print(f"Seen keys saved to {self.path} ({len(self.hashes)} transactions)")
+
+    def state(self): # identifies the stored history, e.g. for a cache key
+        if not os.path.exists(self.path):
+            return None
+        stat = os.stat(self.path)
+        return [os.path.abspath(self.path), stat.st_size, stat.st_mtime_ns]
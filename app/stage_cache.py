@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+
+def fingerprint_files(paths): # identity of the input files, same rule as the DataManager load cache
+    states = [(os.path.abspath(p), os.path.getsize(p), os.stat(p).st_mtime_ns) for p in paths]
+    return hashlib.sha256(json.dumps(states).encode()).hexdigest()
+
+
+def fingerprint_frame(df): # content hash of a dataframe, for inputs that do not come from files
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    return h.hexdigest()
+
+
+class StageCache:
+    # On-disk results of pipeline stages. A stage's key is the hash of its name, its parameters
+    # and the keys of its inputs, so a change upstream (new data, new rules) changes every key below it.
+    # Least recently used entries are removed once the cache is bigger than max_size_mb.
+
+    def __init__(self, cache_dir="cache/stages", max_size_mb=4096):
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 ** 2
+
+    def make_key(self, stage, params, *input_keys):
+        payload = json.dumps([stage, params, list(input_keys)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+    def entry_path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key}.pkl")
+
+    def load(self, stage, key):
+        path = self.entry_path(stage, key)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            result = pickle.load(f)
+        os.utime(path) # mark as recently used
+        print(f"Loaded cached '{stage}' result ({key[:8]})")
+        return result
+
+    def save(self, stage, key, result):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(stage, key)
+
+        # older results of the same stage are kept until eviction, switching back stays cheap
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self): # (path, size, last use), oldest first
+        if not os.path.exists(self.cache_dir):
+            return []
+
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                found.append((os.path.join(self.cache_dir, name), st.st_size, st.st_mtime))
+        return sorted(found, key=lambda e: e[2])
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries[:-1]: # never evict the newest entry
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+            print(f"Evicted {os.path.basename(path)} from stage cache")
+
+    def invalidate(self, stage=None): # drop one stage's results, or everything
+        removed = 0
+        for path, _, _ in self.entries():
+            if stage is None or os.path.basename(path).startswith(f"{stage}-"):
+                os.remove(path)
+                removed += 1
+        print(f"Removed {removed} cached results" + (f" of stage '{stage}'" if stage else ""))
+        return removed
+
+    def summary(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries) / 1024 ** 2
+        return f"{len(entries)} cached results, {total:.1f} MB of {self.max_size / 1024 ** 2:.0f} MB"
@@ -0,0 +1,216 @@
+import cProfile
+import functools
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+from data_manager import DataManager
+from data_preprocessor import DataPreprocessor
+from feature_engineer import FeatureEngineer
+from memory_utils import get_peak_memory_mb, get_process_memory_mb
+from pipeline import FraudPipeline
+from report_generator import ReportGenerator
+from risk_scorer_customer import RiskScorer
+from rule_comparison import RuleComparison
+from transaction_flagger import TransactionFlagger
+
+RSS_SAMPLE_S = 0.01 # how often resident memory is sampled for the per-stage peak
+
+# (class, methods) that get timed, sub-steps are recorded nested under the stage that calls them
+STAGE_METHODS = [
+    (FraudPipeline, ['load', 'clean', 'build_features', 'score', 'flag', 'compare_rules']),
+    (DataManager, ['load_dataset']),
+    (DataPreprocessor, ['clean_all', 'drop_unnamed_column', 'remove_duplicates', 'convert_datetime',
+                        'extract_time_features', 'calculate_age', 'drop_unnecessary_columns', 'compact_dtypes']),
+    (FeatureEngineer, ['build_all_features', 'aggregate_spending', 'calculate_velocity',
+                       'calculate_rolling_stats', 'calculate_behavioral_patterns',
+                       'calculate_geo_profile']),
+    (RiskScorer, ['calculate_risk_scores', 'assign_risk_bands']),
+    (TransactionFlagger, ['flag_suspicious_activity', 'calculate_performance']),
+    (RuleComparison, ['shared_columns', 'run']),
+    (ReportGenerator, ['export_report_to_txt']),
+]
+
+
+def count_rows(obj, result): # rows the stage works on: its input frame, else what it returned
+    df = getattr(obj, 'df', None)
+    if isinstance(df, pd.DataFrame):
+        return len(df)
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    return None
+
+
+class StageProfiler:
+    # Times the pipeline stage methods while enabled. Enabling swaps the class methods for
+    # timed wrappers and disabling puts the originals back, so nothing is measured (or slowed down)
+    # when the profiler is off. Every call gives one record: wall / CPU time, rows and rows/sec,
+    # resident memory before / after / peak, and with trace_allocations the peak allocated inside the stage.
+    # The resident peak of a stage comes from a background thread sampling RSS every RSS_SAMPLE_S while
+    # the stage runs, so a spike shorter than that can be missed. rss_process_peak_mb is the process
+    # high-water mark so far, which every stage after the largest one shares.
+
+    def __init__(self, trace_path="outputs/stage_trace.json", cprofile_dir=None, trace_allocations=False):
+        self.trace_path = trace_path
+        self.cprofile_dir = cprofile_dir # one .prof file per top-level stage call
+        self.trace_allocations = trace_allocations # exact per-stage peaks, but slows allocation heavy code
+        self.records = []
+        self.originals = {}
+        self.stack = [] # open stage calls, innermost last
+        self.started = None
+        self.owns_tracing = False
+        self.sampler = None
+        self.stop_sampling = threading.Event()
+
+    def enable(self):
+        if self.originals:
+            return self
+
+        for cls, methods in STAGE_METHODS:
+            for name in methods:
+                original = cls.__dict__[name]
+                self.originals[(cls, name)] = original
+                setattr(cls, name, self.wrap(f"{cls.__name__}.{name}", original))
+
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.owns_tracing = True
+        self.stop_sampling.clear()
+        self.sampler = threading.Thread(target=self.sample_rss, daemon=True)
+        self.sampler.start()
+        self.started = time.time()
+        return self
+
+    def sample_rss(self): # raises the rss peak of every open stage call
+        while not self.stop_sampling.wait(RSS_SAMPLE_S):
+            rss = get_process_memory_mb()
+            for frame in list(self.stack):
+                frame['rss_peak'] = max(frame['rss_peak'], rss)
+
+    def disable(self):
+        for (cls, name), original in self.originals.items():
+            setattr(cls, name, original)
+        self.originals = {}
+        if self.sampler is not None:
+            self.stop_sampling.set()
+            self.sampler.join()
+            self.sampler = None
+        if self.owns_tracing:
+            tracemalloc.stop()
+            self.owns_tracing = False
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+        if self.trace_path:
+            self.write()
+
+    def wrap(self, stage, method):
+        profiler = self
+
+        @functools.wraps(method)
+        def timed(obj, *args, **kwargs):
+            return profiler.run(stage, method, obj, args, kwargs)
+        return timed
+
+    def run(self, stage, method, obj, args, kwargs):
+        rss_before = get_process_memory_mb()
+        frame = {'stage': stage, 'depth': len(self.stack), 'alloc_peak': 0, 'rss_peak': rss_before}
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack: # keep the caller's peak before resetting it for this stage
+                self.stack[-1]['alloc_peak'] = max(self.stack[-1]['alloc_peak'], peak)
+            tracemalloc.reset_peak()
+            frame['alloc_start'] = frame['alloc_peak'] = current
+        self.stack.append(frame)
+
+        profile = cProfile.Profile() if self.cprofile_dir and frame['depth'] == 0 else None
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        error = None
+        try:
+            if profile is not None:
+                result = profile.runcall(method, obj, *args, **kwargs)
+            else:
+                result = method(obj, *args, **kwargs)
+            return result
+        except Exception as e:
+            result = None
+            error = repr(e)
+            raise
+        finally:
+            self.stack.pop()
+            self.record(frame, obj, result, error, wall_start, cpu_start, rss_before, profile)
+
+    def record(self, frame, obj, result, error, wall_start, cpu_start, rss_before, profile):
+        wall = time.perf_counter() - wall_start
+        rows = count_rows(obj, result)
+        rss_after = get_process_memory_mb()
+        rss_peak = max(frame['rss_peak'], rss_after)
+        if self.stack:
+            self.stack[-1]['rss_peak'] = max(self.stack[-1]['rss_peak'], rss_peak)
+        rec = {
+            'stage': frame['stage'],
+            'depth': frame['depth'],
+            'start_s': wall_start - time.perf_counter() + time.time() - self.started,
+            'wall_s': wall,
+            'cpu_s': time.process_time() - cpu_start,
+            'rows': rows,
+            'rows_per_s': rows / wall if rows is not None and wall > 0 else None,
+            'rss_before_mb': rss_before,
+            'rss_after_mb': rss_after,
+            'rss_peak_mb': rss_peak, # sampled while this stage ran
+            'rss_process_peak_mb': get_peak_memory_mb(), # process high-water mark so far
+            'error': error,
+        }
+        rec['rss_delta_mb'] = rec['rss_after_mb'] - rss_before
+
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            stage_peak = max(frame['alloc_peak'], peak)
+            rec['alloc_delta_mb'] = (current - frame['alloc_start']) / 1024 ** 2
+            rec['alloc_peak_mb'] = (stage_peak - frame['alloc_start']) / 1024 ** 2
+            if self.stack:
+                self.stack[-1]['alloc_peak'] = max(self.stack[-1]['alloc_peak'], stage_peak)
+            tracemalloc.reset_peak()
+
+        if profile is not None:
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            rec['cprofile'] = os.path.join(self.cprofile_dir, f"{len(self.records):03d}_{frame['stage']}.prof")
+            profile.dump_stats(rec['cprofile'])
+
+        self.records.append(rec)
+
+    def write(self, path=None):
+        path = path or self.trace_path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        trace = {
+            'started': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)) if self.started else None,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'cpus': os.cpu_count(),
+            'trace_allocations': self.trace_allocations,
+            'stages': sorted(self.records, key=lambda r: r['start_s']), # call order, parents before their sub-steps
+        }
+        with open(path, "w") as f:
+            json.dump(trace, f, indent=2)
+        print(f"Stage trace saved to {path}")
+
+    def print_summary(self):
+        print("\nStage profile:")
+        print(f"{'stage':<52}{'wall s':>9}{'cpu s':>9}{'rows':>11}{'rows/s':>12}{'rss +MB':>9}")
+        for r in sorted(self.records, key=lambda r: r['start_s']):
+            name = "  " * r['depth'] + r['stage']
+            rows = f"{r['rows']}" if r['rows'] is not None else "-"
+            rate = f"{r['rows_per_s']:.0f}" if r['rows_per_s'] is not None else "-"
+            print(f"{name:<52}{r['wall_s']:9.3f}{r['cpu_s']:9.3f}{rows:>11}{rate:>12}{r['rss_delta_mb']:9.1f}")
@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# category mix of the Kaggle data, the fraud mix leans to the online / grocery categories
+CATEGORIES = ['gas_transport', 'grocery_pos', 'home', 'shopping_pos', 'kids_pets', 'shopping_net', 'entertainment',
+              'food_dining', 'personal_care', 'health_fitness', 'misc_pos', 'misc_net', 'grocery_net', 'travel']
+CATEGORY_SHARE = [0.10, 0.095, 0.095, 0.09, 0.087, 0.075, 0.072, 0.071, 0.07, 0.066, 0.062, 0.049, 0.035, 0.033]
+FRAUD_CATEGORY_SHARE = [0.06, 0.23, 0.02, 0.09, 0.03, 0.23, 0.03, 0.02, 0.03, 0.02, 0.03, 0.16, 0.01, 0.04]
+
+FIRST_NAMES = ['Jennifer', 'Michael', 'Mary', 'David', 'Linda', 'James', 'Susan', 'Robert', 'Karen', 'John']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Moore']
+JOBS = ['Engineer', 'Teacher', 'Nurse', 'Accountant', 'Designer', 'Lawyer', 'Pharmacist', 'Surveyor', 'Editor', 'Chef']
+STATES = ['TX', 'NY', 'PA', 'CA', 'OH', 'MI', 'IL', 'FL', 'AL', 'MO']
+
+COLUMNS = ['Unnamed: 0', 'trans_date_trans_time', 'cc_num', 'merchant', 'category', 'amt', 'first', 'last', 'gender',
+           'street', 'city', 'state', 'zip', 'lat', 'long', 'city_pop', 'job', 'dob', 'trans_num', 'unix_time',
+           'merch_lat', 'merch_long', 'is_fraud']
+
+
+class SyntheticDataGenerator:
+    # Seeded transactions with the fraudTrain / fraudTest schema, for benchmarks and tests without the Kaggle files.
+    # Cards have a fixed home location, spending level and category taste; fraud rows are larger,
+    # mostly at night, in the online / grocery categories and further from home.
+    # The same seed, card count and fraud rate always give the same rows, also when written in chunks.
+
+    def __init__(self, n_cards=1000, fraud_rate=0.006, seed=42, start="2019-01-01", days=365, merchants=700):
+        self.n_cards = n_cards
+        self.fraud_rate = fraud_rate
+        self.seed = seed
+        self.start = pd.Timestamp(start)
+        self.days = days
+        self.n_merchants = merchants
+        self.cards = self.make_cards()
+
+    def make_cards(self):
+        rng = np.random.default_rng([self.seed, 0])
+        n = self.n_cards
+        cc_num = rng.choice(np.arange(10 ** 11, 10 ** 11 + 50 * n, dtype=np.int64), n, replace=False) * 1000 + rng.integers(0, 1000, n)
+        cards = pd.DataFrame({
+            'cc_num': cc_num,
+            'first': rng.choice(FIRST_NAMES, n),
+            'last': rng.choice(LAST_NAMES, n),
+            'gender': rng.choice(['F', 'M'], n),
+            'street': [f"{k} Main St" for k in rng.integers(1, 9999, n)],
+            'city': [f"City{k}" for k in rng.integers(0, max(n // 2, 1), n)],
+            'state': rng.choice(STATES, n),
+            'zip': rng.integers(10000, 99999, n).astype(np.int32),
+            'lat': np.round(rng.uniform(25, 49, n), 4),
+            'long': np.round(rng.uniform(-124, -67, n), 4),
+            'city_pop': np.round(rng.lognormal(8, 2, n)).astype(np.int32) + 20,
+            'job': rng.choice(JOBS, n),
+            'dob': (pd.Timestamp("1930-01-01") + pd.to_timedelta(rng.integers(0, 70 * 365, n), unit='D')).strftime('%Y-%m-%d'),
+        })
+        self.spend_level = rng.normal(3.6, 0.4, n) # mean of log(amount) per card
+        self.activity = rng.gamma(2.0, 1.0, n) # some cards transact much more than others
+        self.activity /= self.activity.sum()
+        return cards
+
+    def generate_chunk(self, n_rows, chunk=0, n_chunks=1, first_row=0):
+        # chunk i covers the i-th slice of the time period, so chunks written in order stay sorted by time
+        rng = np.random.default_rng([self.seed, 1, chunk])
+        card_idx = rng.choice(self.n_cards, n_rows, p=self.activity)
+        is_fraud = rng.random(n_rows) < self.fraud_rate
+        n_fraud = int(is_fraud.sum())
+
+        span = self.days * 86400 / n_chunks
+        seconds = np.sort(rng.uniform(chunk * span, (chunk + 1) * span, n_rows)).astype(np.int64)
+        # fraud goes to late night: move it to 22:00-04:00 of the same day
+        day_start = seconds[is_fraud] // 86400 * 86400
+        seconds[is_fraud] = day_start + (22 * 3600 + rng.integers(0, 6 * 3600, n_fraud)) % 86400
+        seconds = np.clip(seconds, int(chunk * span), int((chunk + 1) * span) - 1)
+        order = np.argsort(seconds, kind='stable')
+        seconds, card_idx, is_fraud = seconds[order], card_idx[order], is_fraud[order]
+        times = self.start + pd.to_timedelta(seconds, unit='s')
+
+        category = rng.choice(len(CATEGORIES), n_rows, p=CATEGORY_SHARE)
+        category[is_fraud] = rng.choice(len(CATEGORIES), n_fraud, p=FRAUD_CATEGORY_SHARE)
+        amt = np.exp(rng.normal(self.spend_level[card_idx], 0.8))
+        amt[is_fraud] = rng.uniform(150, 1300, n_fraud)
+
+        cards = self.cards.iloc[card_idx].reset_index(drop=True)
+        distance = np.where(is_fraud, 3.0, 0.6) # degrees from home
+        df = pd.DataFrame({
+            'Unnamed: 0': np.arange(first_row, first_row + n_rows),
+            'trans_date_trans_time': times.strftime('%Y-%m-%d %H:%M:%S'),
+            'cc_num': cards['cc_num'],
+            'merchant': [f"fraud_Merchant{k}" for k in rng.integers(0, self.n_merchants, n_rows)],
+            'category': np.array(CATEGORIES)[category],
+            'amt': np.round(amt, 2),
+        })
+        for col in ['first', 'last', 'gender', 'street', 'city', 'state', 'zip', 'lat', 'long', 'city_pop', 'job', 'dob']:
+            df[col] = cards[col].to_numpy()
+        df['trans_num'] = [b.hex() for b in np.frombuffer(rng.bytes(16 * n_rows), dtype='S16')] if n_rows else []
+        epoch = (self.start - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)
+        df['unix_time'] = epoch + seconds - 220924800 # the Kaggle unix_time runs 7 years behind the timestamp
+        df['merch_lat'] = np.round(df['lat'].to_numpy() + rng.uniform(-1, 1, n_rows) * distance, 6)
+        df['merch_long'] = np.round(df['long'].to_numpy() + rng.uniform(-1, 1, n_rows) * distance, 6)
+        df['is_fraud'] = is_fraud.astype(np.int8)
+        return df[COLUMNS]
+
+    def generate(self, n_rows):
+        return self.generate_chunk(n_rows)
+
+    def write_csv(self, path, n_rows, chunk_rows=1_000_000): # large files are written chunk by chunk
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        n_chunks = max(1, -(-n_rows // chunk_rows))
+        bounds = np.linspace(0, n_rows, n_chunks + 1).astype(np.int64)
+        tmp_path = path + ".tmp"
+        for chunk in range(n_chunks):
+            df = self.generate_chunk(int(bounds[chunk + 1] - bounds[chunk]), chunk, n_chunks, int(bounds[chunk]))
+            df.to_csv(tmp_path, mode="w" if chunk == 0 else "a", header=chunk == 0, index=False)
+        os.replace(tmp_path, path)
+        print(f"Wrote {n_rows} synthetic rows ({self.n_cards} cards) to {path}")
+        return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic transactions CSV with the Kaggle schema")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--fraud-rate", type=float, default=0.006)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", default="2019-01-01")
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    SyntheticDataGenerator(args.cards, args.fraud_rate, args.seed, args.start, args.days).write_csv(args.path, args.rows)
@@ -0,0 +1,132 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from rule_engine import RuleEngine
+
+
+class ThresholdBacktester:
+    # Evaluates a grid of flagging thresholds against is_fraud in one pass over the transactions.
+    # The rule shape is the one of the default flag rules:
+    #   (danger category OR night hours OR amt > avg * multiplier) AND amt >= floor, OR customer in flag band
+    # Every row is counted once into a small histogram (category, hour, amount bin, ratio bin, fraud),
+    # then each grid point is read from cumulative sums of that histogram instead of rescanning the rows.
+    # Rows of sampled data count for their sample_weight, so the counts estimate the full data.
+
+    def __init__(self, df, scored_profiles, rules=None, flag_band='Critical'):
+        self.df = df
+        self.profiles = scored_profiles
+        self.rules = rules if rules is not None else RuleEngine()
+        self.flag_band = flag_band
+        self.save_dir = "outputs/images"
+        self.results = None
+
+    def run(self, amount_floors=None, multipliers=None, night_starts=None, night_ends=None):
+        print("\n--- THRESHOLD BACKTEST STARTED ---\n")
+        floors = np.sort(np.asarray(amount_floors if amount_floors is not None else np.arange(50, 1001, 25), dtype=float))
+        mults = np.sort(np.asarray(multipliers if multipliers is not None else np.arange(1.5, 6.01, 0.5), dtype=float))
+        starts = list(night_starts if night_starts is not None else [20, 21, 22, 23])
+        ends = list(night_ends if night_ends is not None else [3, 4, 5, 6])
+        n_a, n_m = len(floors), len(mults)
+
+        # per-row inputs, one vectorized pass
+        avg_map = self.profiles.set_index('cc_num')['avg_transaction']
+        band_map = self.profiles.set_index('cc_num')['risk_band']
+        amt = self.df['amt'].to_numpy(dtype=float)
+        fraud = self.df['is_fraud'].to_numpy().astype(np.int64)
+        hour = self.df['trans_hour'].to_numpy().astype(np.int64)
+        danger = self.df['category'].isin(self.rules.config['lists']['danger_categories']).to_numpy()
+        critical = (self.df['cc_num'].map(band_map) == self.flag_band).to_numpy()
+        ratio = amt / self.df['cc_num'].map(avg_map).to_numpy(dtype=float)
+        weights = self.df['sample_weight'].to_numpy(dtype=float) if 'sample_weight' in self.df.columns else None
+        row_count = weights if weights is not None else np.ones(len(amt), dtype=np.int64)
+        row_money = amt * weights if weights is not None else amt
+
+        a_bin = np.searchsorted(floors, amt, side='right') # passes floor j when a_bin > j
+        m_bin = np.searchsorted(mults, ratio, side='left') # passes multiplier k when m_bin > k
+        m_bin[np.isnan(ratio)] = 0 # unknown average never passes
+
+        # critical customers are flagged whatever the thresholds
+        crit_tp = row_count[critical & (fraud == 1)].sum()
+        crit_fp = row_count[critical & (fraud == 0)].sum()
+        crit_money = row_money[critical & (fraud == 1)].sum()
+
+        rest = ~critical
+        shape = (2, 24, n_a + 1, n_m + 1, 2)
+        cell = np.ravel_multi_index((danger[rest].astype(np.int64), hour[rest], a_bin[rest], m_bin[rest], fraud[rest]), shape)
+        counts = np.bincount(cell, weights=weights[rest] if weights is not None else None, minlength=np.prod(shape)).reshape(shape)
+        money = np.bincount(cell, weights=row_money[rest], minlength=np.prod(shape)).reshape(shape)
+        total_fraud = row_count[fraud == 1].sum()
+
+        rows = []
+        for start in starts:
+            for end in ends:
+                night = np.zeros(24, dtype=bool)
+                night[start:] = True
+                night[:end + 1] = True
+
+                # rows flagged by category or night time only need the amount floor
+                by_floor_n = counts[1].sum(axis=0) + counts[0][night].sum(axis=0)
+                by_floor_s = money[1].sum(axis=0) + money[0][night].sum(axis=0)
+                by_ratio_n = counts[0][~night].sum(axis=0)
+                by_ratio_s = money[0][~night].sum(axis=0)
+
+                # cumulative counts: everything with a_bin > j (and m_bin > k)
+                floor_n = self.suffix_sum(by_floor_n.sum(axis=1), axis=0)[1:]
+                floor_s = self.suffix_sum(by_floor_s.sum(axis=1), axis=0)[1:]
+                ratio_n = self.suffix_sum(self.suffix_sum(by_ratio_n, axis=0), axis=1)[1:, 1:]
+                ratio_s = self.suffix_sum(self.suffix_sum(by_ratio_s, axis=0), axis=1)[1:, 1:]
+
+                tp = crit_tp + floor_n[:, None, 1] + ratio_n[:, :, 1]
+                fp = crit_fp + floor_n[:, None, 0] + ratio_n[:, :, 0]
+                caught = crit_money + floor_s[:, None, 1] + ratio_s[:, :, 1]
+
+                grid_a, grid_m = np.meshgrid(floors, mults, indexing='ij')
+                rows.append(pd.DataFrame({
+                    'amount_floor': grid_a.ravel(),
+                    'avg_multiplier': grid_m.ravel(),
+                    'night_start': start,
+                    'night_end': end,
+                    'flagged': (tp + fp).ravel(),
+                    'tp': tp.ravel(),
+                    'fp': fp.ravel(),
+                    'fn': (total_fraud - tp).ravel(),
+                    'money_caught': caught.ravel(),
+                }))
+
+        self.results = pd.concat(rows, ignore_index=True)
+        self.results['recall'] = self.results['tp'] / total_fraud if total_fraud > 0 else 0.0
+        flagged = self.results['flagged'].replace(0, np.nan)
+        self.results['precision'] = (self.results['tp'] / flagged).fillna(0.0)
+
+        print(f"Evaluated {len(self.results)} threshold combinations over {len(self.df)} rows")
+        best = self.results.sort_values(['recall', 'precision'], ascending=False).head(5)
+        print("\nHighest recall combinations:")
+        print(best.to_string(index=False))
+        print("\n--- THRESHOLD BACKTEST FINISHED ---\n")
+        return self.results
+
+    def suffix_sum(self, arr, axis): # out[i] = sum of arr[i:] along the axis
+        return np.flip(np.cumsum(np.flip(arr, axis=axis), axis=axis), axis=axis)
+
+    def export_results(self, path="backtest_results.csv"):
+        self.results.to_csv(path, index=False)
+        print(f"Backtest table saved to {path}")
+
+    def plot_pr_curve(self, show=False):
+        res = self.results
+        # best precision reachable at each recall level
+        frontier = res.sort_values(['recall', 'precision'], ascending=False)
+        frontier = frontier[frontier['precision'] >= frontier['precision'].cummax()]
+
+        plt.figure(figsize=(10, 6))
+        plt.scatter(res['recall'] * 100, res['precision'] * 100, s=4, alpha=0.3, color='blue', label='Threshold combinations')
+        plt.plot(frontier['recall'] * 100, frontier['precision'] * 100, color='red', label='Best precision per recall')
+        plt.xlabel('Recall (%)')
+        plt.ylabel('Precision (%)')
+        plt.title('Flagging thresholds: precision vs recall')
+        plt.legend()
+        plt.savefig(f"{self.save_dir}/pr_curve.png")
+        if show:
+            plt.show()
+        plt.close()
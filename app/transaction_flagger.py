@@ -1,13 +1,46 @@
 import numpy as np
 
+from memory_utils import get_frame_memory_mb, get_process_memory_mb, print_memory_report
+from metrics_engine import MetricsEngine
+from rule_engine import RuleEngine
+from geo_features import GEO_COLUMNS, compute_geo_features
+from window_features import WINDOW_COLUMNS, compute_window_features
+
+
+def compute_rule_columns(df, profiles, columns):
+    # Values of the columns the flag rules read but the clean data lacks: window features,
+    # distance / travel features, and profile fields (e.g. radius_p90_km) looked up by card.
+    # Only the requested ones are computed, so rules that do not use them cost nothing.
+    result = {}
+    window = [c for c in WINDOW_COLUMNS if c in columns]
+    if window:
+        features = compute_window_features(df['cc_num'], df['trans_date_trans_time'], df['amt'])
+        result.update({c: features[c] for c in window})
+
+    geo = [c for c in GEO_COLUMNS if c in columns]
+    if geo:
+        features = compute_geo_features(df['cc_num'], df['trans_date_trans_time'],
+                                        df['lat'], df['long'], df['merch_lat'], df['merch_long'])
+        result.update({c: features[c] for c in geo})
+
+    for col in columns:
+        if col in profiles.columns and col != 'cc_num':
+            result[col] = df['cc_num'].map(profiles.set_index('cc_num')[col]).to_numpy()
+    return result
+
 class TransactionFlagger:
-    def __init__(self, original_df, scored_profiles):
-        self.df = original_df.copy()
+    def __init__(self, original_df, scored_profiles, copy=True, rules=None):
+        # copy=False shares the column data, the added columns stay in this stage
+        self.df = original_df.copy() if copy else original_df.copy(deep=False)
         self.profiles = scored_profiles
+        self.rules = rules if rules is not None else RuleEngine() # flag rules from config
         self.results_df = None
+        self.metrics = None
+
+    def flag_suspicious_activity(self, output_path="flagged_transactions.csv"): # output_path=None skips the export
+        frame_before = get_frame_memory_mb(self.df)
+        rss_before = get_process_memory_mb()
 
-    def flag_suspicious_activity(self):
-        
         # add risk and avg transaction to main df
         risk_map = self.profiles.set_index('cc_num')['risk_band']
         self.df['risk_level'] = self.df['cc_num'].map(risk_map)
@@ -15,62 +48,44 @@ class TransactionFlagger:
         avg_map = self.profiles.set_index('cc_num')['avg_transaction']
         self.df['cust_avg'] = self.df['cc_num'].map(avg_map)
 
-        # Transaction flagging conditions
-        danger_cats = ['shopping_net', 'grocery_pos', 'misc_net']
-        
-        cond1 = self.df['category'].isin(danger_cats)
-        cond2 = (self.df['amt'] >= 200) 
-        cond3 = (self.df['trans_hour'] >= 23) | (self.df['trans_hour'] <= 4)
-        cond4 = self.df['amt'] > (self.df['cust_avg'] * 3)
-        cond5 = (self.df['risk_level'] == 'Critical')
-
-        # default not flagged
-        self.df['is_flagged'] = 0
-        
-        # flag if:
-        fraud = (cond1 & cond2) | (cond3 & cond2) | (cond4 & cond2) | cond5
+        # window, distance and profile columns, only those the enabled rules use
+        needed = sorted(self.rules.flag_plan.columns() - set(self.df.columns))
+        extra = compute_rule_columns(self.df, self.profiles, needed)
+        if extra:
+            print(f"Computing rule columns: {', '.join(extra)}")
+        for col, values in extra.items():
+            self.df[col] = values
+
+        # Transaction flagging conditions from config/rules.json, shared checks (like amount >= 200) run once
+        print(f"Flag rules: {self.rules.flag_plan.describe()}")
 
-        self.df['is_flagged'] = np.where(fraud, 1, 0)
+        # flag if any rule matches
+        fraud = self.rules.flag(self.df)
+
+        self.df['is_flagged'] = np.where(fraud, 1, 0).astype('int8')
 
         self.results_df = self.df
+        print_memory_report("flagging", frame_before, get_frame_memory_mb(self.df), rss_before)
 
-        self.df.to_csv("flagged_transactions.csv", index=False)
+        if output_path:
+            self.df.to_csv(output_path, index=False)
 
         return self.results_df
 
     def calculate_performance(self):
-        # Calculate metrics
-
-        n_total = len(self.df)
-        total_fraud = self.df['is_fraud'].sum()
-        true_pos = ((self.df['is_flagged'] == 1) & (self.df['is_fraud'] == 1)).sum()
-        false_pos = ((self.df['is_flagged'] == 1) & (self.df['is_fraud'] == 0)).sum()
-        false_neg = ((self.df['is_flagged'] == 0) & (self.df['is_fraud'] == 1)).sum()
-        
-        # calculate recall
-        rec_val = (true_pos / total_fraud) * 100
+        # confusion matrix, money and the per slice breakdowns in one pass
+        self.metrics = MetricsEngine(self.df).compute()
 
         print("\n--- FLAGGING TRANSACTIONS STARTED ---")
         
         print("\nTop fraud categories ")
-        # fraud rows for each categories
-        f_rows = self.df[self.df['is_flagged'] == 1]
-        print(f_rows['category'].value_counts().head(5))
+        print(self.metrics.top('category', 5))
         
         print("\nPerformance:")
-        print(f"Total rows:{n_total}")        
-        print(f"Actual fraud (total fraud):{total_fraud}")
-        print(f"Caught fraud (true positives):{true_pos}")
-        print(f"Missed cases (false negatives):{false_neg}")
-        print(f"False alarms (true positives):{false_pos}")
-        print(f"Detection Rate(recall): {rec_val:.2f}%")
-
-        # amount saved from blocked transactions.
-        savings_data = self.df[(self.df['is_flagged'] == 1) & (self.df['is_fraud'] == 1)]
-        total_money = savings_data['amt'].sum()
-        print(f"Money saved from blocked frauds: ${total_money:.2f}")
+        self.metrics.print_summary()
 
         print("\n--- FLAGGING TRANSACTIONS FINISHED ---")
+        return self.metrics
         
 
     def get_flagged_data(self):
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# look-back windows in seconds
+WINDOWS = {'1h': 3600, '24h': 86400, '7d': 7 * 86400}
+
+
+def window_columns(windows=None):
+    names = []
+    for label in (windows or WINDOWS):
+        names += [f'txn_count_{label}', f'txn_amt_{label}']
+    return names + ['secs_since_prev_txn']
+
+
+WINDOW_COLUMNS = window_columns()
+
+
+def compute_window_features(cc_num, times, amt, windows=None):
+    # For every transaction: number and amount of the same card's transactions in the last
+    # 1h / 24h / 7d (the transaction itself included), and seconds since the card's previous one.
+    # Rows are sorted once by (card, time); a window start is then a binary search on a
+    # combined card + time key, and window amounts come from a running sum, so O(n log n) overall.
+    windows = windows or WINDOWS
+    cc = np.asarray(cc_num)
+    secs = pd.to_datetime(times).to_numpy().astype('datetime64[s]').astype(np.int64)
+    amt = np.asarray(amt, dtype=float)
+    n = len(cc)
+
+    order = np.lexsort((secs, cc)) # stable, ties keep the input order
+    cc_s, t_s, amt_s = cc[order], secs[order] - (secs.min() if n else 0), amt[order]
+
+    new_card = np.ones(n, dtype=bool)
+    new_card[1:] = cc_s[1:] != cc_s[:-1]
+    card_id = np.cumsum(new_card) - 1
+
+    # card_id * span + time is increasing in the sorted order, and windows never reach into the previous card
+    span = (t_s.max() if n else 0) + max(windows.values()) + 1
+    key = card_id * span + t_s
+    csum = np.concatenate([[0.0], np.cumsum(amt_s)])
+    pos = np.arange(n)
+
+    sorted_cols = {}
+    for label, seconds in windows.items():
+        start = np.searchsorted(key, key - seconds, side='right') # first row inside (t - window, t]
+        sorted_cols[f'txn_count_{label}'] = (pos - start + 1).astype(np.int32)
+        sorted_cols[f'txn_amt_{label}'] = csum[pos + 1] - csum[start]
+
+    gap = np.full(n, np.nan)
+    gap[1:] = (t_s[1:] - t_s[:-1]).astype(float)
+    gap[new_card] = np.nan # first transaction of a card has no previous one
+    sorted_cols['secs_since_prev_txn'] = gap
+
+    # back to the input order
+    result = {}
+    for col, values in sorted_cols.items():
+        out = np.empty_like(values)
+        out[order] = values
+        result[col] = out
+    return result
+
+
+def add_window_features(df, windows=None, columns=None): # adds the columns in place, columns=None adds all
+    features = compute_window_features(df['cc_num'], df['trans_date_trans_time'], df['amt'], windows)
+    for col, values in features.items():
+        if columns is None or col in columns:
+            df[col] = values
+    return df
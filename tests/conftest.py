@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the app modules import each other by plain module name, like when run from app/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from group_stats import top_k_per_group
+
+
+def test_top_k_matches_mode():
+    keys = pd.Series([1, 1, 1, 2, 2, 3])
+    values = pd.Series(['b', 'a', 'b', 'c', 'a', 'c'])
+    result = top_k_per_group(keys, values, k=1)
+
+    expected = values.groupby(keys).agg(lambda x: x.mode()[0])
+    assert result['top_1'].tolist() == expected.tolist()
+    assert result['top_1_share'].tolist() == [2 / 3, 0.5, 1.0]
+
+
+def test_groups_with_fewer_than_k_values_get_nan():
+    result = top_k_per_group(pd.Series([1, 1, 2, 2]), pd.Series(['a', 'b', 'c', 'a']), k=3)
+
+    assert result.loc[1, ['top_1', 'top_2']].tolist() == ['a', 'b']
+    assert result.loc[2, ['top_1', 'top_2']].tolist() == ['a', 'c']
+    assert result['top_3'].isna().all() # no value the group never had
+    assert result['top_3_share'].isna().all()
+
+
+def test_fewer_than_k_values_with_integer_and_categorical_values():
+    keys = pd.Series([1, 1, 2])
+    ints = top_k_per_group(keys, pd.Series([5, 6, 7]), k=2)
+    assert ints.loc[1, 'top_2'] == 6
+    assert np.isnan(ints.loc[2, 'top_2'])
+
+    cats = top_k_per_group(keys, pd.Series(pd.Categorical(['x', 'y', 'x'], categories=['x', 'y', 'z'])), k=2)
+    assert cats.loc[1, 'top_2'] == 'y'
+    assert pd.isna(cats.loc[2, 'top_2'])
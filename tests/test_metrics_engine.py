@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+from metrics_engine import slice_codes
+
+
+def test_month_codes_match_formatted_months():
+    times = pd.Series(pd.to_datetime(['2020-03-15 10:00', '2019-12-31 23:59', None, '2020-03-01 00:00', '2020-06-02 12:30']))
+    codes, labels = slice_codes('trans_date_trans_time', times)
+
+    assert labels.tolist() == ['2019-12', '2020-03', '2020-06', '(missing)'] # months without rows are left out
+    assert labels[codes].tolist() == ['2020-03', '2019-12', '(missing)', '2020-03', '2020-06']
+
+
+def test_month_codes_without_known_times():
+    codes, labels = slice_codes('trans_date_trans_time', pd.Series(pd.to_datetime([None, None])))
+    assert labels.tolist() == ['(missing)']
+    assert np.array_equal(codes, [0, 0])
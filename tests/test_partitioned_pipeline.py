@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from partitioned_pipeline import PartitionedPipeline
+from synthetic_data import SyntheticDataGenerator
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return SyntheticDataGenerator(n_cards=50, days=5, seed=1).write_csv(str(tmp_path / "data.csv"), 3000)
+
+
+def test_refuses_a_foreign_non_empty_work_dir(tmp_path, csv_path):
+    work_dir = tmp_path / "mine"
+    work_dir.mkdir()
+    (work_dir / "keep.txt").write_text("not shards")
+
+    with pytest.raises(ValueError):
+        PartitionedPipeline(str(work_dir), n_shards=2).run([csv_path])
+    assert (work_dir / "keep.txt").read_text() == "not shards"
+
+
+def test_rerun_clears_only_its_shards(tmp_path, csv_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    work_dir = tmp_path / "work"
+    PartitionedPipeline(str(work_dir), n_shards=3).run([csv_path])
+    (work_dir / "notes.txt").write_text("kept")
+
+    PartitionedPipeline(str(work_dir), n_shards=2).run([csv_path])
+    assert sorted(os.listdir(work_dir / "raw")) == ["shard_0000", "shard_0001"] # shards of the first run are gone
+    assert (work_dir / "notes.txt").read_text() == "kept"
+    assert not (tmp_path / "customer_risk_summary.csv").exists() # nothing written to the working directory
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from data_preprocessor import DataPreprocessor
+from feature_engineer import FeatureEngineer
+from profile_store import ProfileStore
+from synthetic_data import SyntheticDataGenerator
+
+
+def assert_same_profiles(full, incremental):
+    full = full.set_index('cc_num').sort_index()
+    incremental = incremental.set_index('cc_num').sort_index().reindex(full.index)
+    assert set(full.columns) == set(incremental.columns)
+
+    for col in full.columns:
+        a, b = full[col], incremental[col]
+        if pd.api.types.is_numeric_dtype(a):
+            same = np.isclose(a.astype(float), b.astype(float), rtol=1e-9, atol=1e-9, equal_nan=True)
+        else:
+            same = (a.astype(object) == b.astype(object)) | (a.isna() & b.isna())
+        assert same.all(), f"{col} differs for {int((~same).sum())} cards"
+
+
+def test_daily_updates_match_full_rebuild():
+    raw = SyntheticDataGenerator(n_cards=200, days=10, seed=7).generate(20000)
+    clean = DataPreprocessor(raw).clean_all()
+    full = FeatureEngineer(clean).build_all_features(show_sample=False)
+
+    store = ProfileStore()
+    day = clean['trans_date_trans_time'].dt.floor('D')
+    for d in sorted(day.unique()):
+        store.update(clean[day == d])
+
+    assert_same_profiles(full, store.get_profiles())
+
+
+def test_merged_stores_match_full_rebuild_on_radius():
+    raw = SyntheticDataGenerator(n_cards=100, days=10, seed=3).generate(8000)
+    clean = DataPreprocessor(raw).clean_all()
+    full = FeatureEngineer(clean).build_all_features(show_sample=False).set_index('cc_num').sort_index()
+
+    half = clean['trans_date_trans_time'] < clean['trans_date_trans_time'].median()
+    store = ProfileStore().update(clean[half]).merge(ProfileStore().update(clean[~half]))
+    merged = store.get_profiles().set_index('cc_num').sort_index()
+
+    for col in ['home_radius_km', 'radius_p90_km']:
+        assert np.allclose(full[col], merged[col].reindex(full.index), equal_nan=True)
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rule_engine import RulePlan
+
+
+@pytest.mark.parametrize('op, value, values', [
+    ('>', 'm', ['gas', 'misc_net', 'travel']),
+    ('<=', 'm', ['gas', 'misc_net', 'travel']),
+    ('==', 'misc_net', ['gas', 'misc_net', 'travel', None]),
+    ('!=', 'misc_net', ['gas', 'misc_net', 'travel', None]),
+    ('in', ['gas', 'travel'], ['gas', 'misc_net', 'travel', None]),
+    ('not_in', ['gas'], ['gas', 'misc_net', 'travel', None]),
+])
+def test_categorical_column_matches_object_column(op, value, values):
+    plan = RulePlan([{'name': 'r', 'when': {'col': 'category', 'op': op, 'value': value}}])
+    cat = plan.evaluate(pd.DataFrame({'category': pd.Categorical(values)}))['r']
+    obj = plan.evaluate(pd.DataFrame({'category': pd.Series(values, dtype=object)}))['r']
+    assert np.array_equal(cat, obj)
+
+
+def test_ordering_on_categorical_is_not_equality():
+    plan = RulePlan([{'name': 'r', 'when': {'col': 'category', 'op': '>', 'value': 'm'}}])
+    mask = plan.evaluate(pd.DataFrame({'category': pd.Categorical(['gas', 'm', 'travel'])}))['r']
+    assert mask.tolist() == [False, False, True]
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import pandas as pd
+
+from scoring_service import ScoringServer, TransactionScorer
+
+PROFILES = pd.DataFrame({'cc_num': [1], 'risk_band': ['Low'], 'avg_transaction': [10.0]})
+VALID = json.dumps({'cc_num': 1, 'category': 'misc_net', 'amt': 5.0,
+                    'trans_date_trans_time': '2020-06-21 12:14:25'}).encode()
+
+
+async def send(server, raw): # status line of the response, None when the server closed without one
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(raw)
+    await writer.drain()
+    status = await asyncio.wait_for(reader.readline(), 5)
+    writer.close()
+    return status.decode().split(" ", 1)[1].strip() if status else None
+
+
+async def statuses(requests):
+    server = ScoringServer(TransactionScorer(PROFILES), port=0)
+    await server.start()
+    try:
+        return [await send(server, raw) for raw in requests]
+    finally:
+        await server.stop()
+
+
+def test_malformed_requests_get_400():
+    valid = f"POST /score HTTP/1.1\r\nContent-Length: {len(VALID)}\r\n\r\n".encode() + VALID
+    result = asyncio.run(statuses([
+        b"GARBAGE\r\n\r\n", # no path
+        b"POST /score HTTP/1.1\r\nno colon here\r\n\r\n",
+        b"POST /score HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+        b"POST /score HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+        b"POST /score HTTP/1.1\r\n\xff\xfe: x\r\n\r\n", # not utf-8
+        valid, # the server keeps working after them
+    ]))
+    assert result == ["400 Bad Request"] * 5 + ["200 OK"]
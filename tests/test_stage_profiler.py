@@ -0,0 +1,30 @@
+import time
+
+import numpy as np
+
+from stage_profiler import StageProfiler
+
+
+class Stage:
+    def big(self): # holds ~200 MB for a while, then frees it
+        block = np.ones(25_000_000)
+        time.sleep(0.1)
+        return float(block[-1])
+
+    def small(self):
+        time.sleep(0.1)
+
+
+def test_rss_peak_is_per_stage():
+    profiler = StageProfiler(trace_path=None).enable()
+    try:
+        stage = Stage()
+        profiler.run('big', Stage.big, stage, (), {})
+        profiler.run('small', Stage.small, stage, (), {})
+    finally:
+        profiler.disable()
+
+    big, small = profiler.records
+    assert big['rss_peak_mb'] - big['rss_before_mb'] > 150
+    assert small['rss_peak_mb'] < big['rss_peak_mb'] - 150 # not the process peak left by the big stage
+    assert small['rss_process_peak_mb'] > big['rss_peak_mb'] - 1 # ru_maxrss and psutil round a little differently